@@ -1,10 +1,30 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import google.generativeai as genai
+from google.generativeai.types import generation_types
+from google.api_core import exceptions as google_exceptions
 import os
-from typing import Dict, Any
-import json
+import re
+import random
+import asyncio
+import logging
+import hashlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import Dict, Any, List, Literal, Optional, Tuple
+import numpy as np
+import orjson
+from pydantic import BaseModel
+
+from service_logging import setup_logging
+
+try:
+    import redis.asyncio as redis_asyncio  # optional shared cache
+except ImportError:
+    redis_asyncio = None  # type: ignore
 
 # Load .env if present
 try:
@@ -13,13 +33,390 @@ try:
 except Exception:
     pass
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Configure genai with either GOOGLE_API_KEY or GEMINI_API_KEY
 api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 if api_key:
     genai.configure(api_key=api_key)
 
-app = FastAPI()
+# Concurrent evaluations for the same job title are coalesced into a single
+# Gemini request of up to FEEDBACK_MAX_BATCH items, waiting at most
+# FEEDBACK_MAX_WAIT_MS for the batch to fill.
+FEEDBACK_MAX_BATCH = int(os.getenv("FEEDBACK_MAX_BATCH", "8"))
+FEEDBACK_MAX_WAIT_MS = int(os.getenv("FEEDBACK_MAX_WAIT_MS", "30"))
+
+FeedbackItem = Tuple[str, str, str]  # (question, category, answer)
+
+# At most GEMINI_CONCURRENCY Gemini calls are in flight per worker; rate-limit
+# and transient server errors are retried with exponential backoff.
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "50"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+_RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+_gemini_semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+# Evaluations are cached in-process: exact hits on the whole request, and
+# semantic hits when a new answer to the same question embeds within
+# FEEDBACK_SEMANTIC_THRESHOLD cosine similarity of a cached one.
+FEEDBACK_CACHE_SIZE = int(os.getenv("FEEDBACK_CACHE_SIZE", "1024"))
+FEEDBACK_SEMANTIC_THRESHOLD = float(os.getenv("FEEDBACK_SEMANTIC_THRESHOLD", "0.95"))
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# When REDIS_URL is set, exact hits are also shared across workers (and
+# survive restarts) through Redis, with entries expiring after
+# FEEDBACK_CACHE_TTL seconds.
+REDIS_URL = os.getenv("REDIS_URL")
+FEEDBACK_CACHE_TTL = int(os.getenv("FEEDBACK_CACHE_TTL", "86400"))
+REDIS_KEY_PREFIX = "feedback:"
+
+
+def _cache_key(*parts: str) -> str:
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FeedbackCache:
+    """Bounded LRU of evaluated responses with an optional semantic lookup."""
+
+    def __init__(self, max_entries: int, threshold: float) -> None:
+        self.max_entries = max(1, max_entries)
+        self.threshold = threshold
+        # key -> (context key, unit embedding or None, response)
+        self._entries: "OrderedDict[str, Tuple[str, Optional[np.ndarray], Dict[str, Any]]]" = OrderedDict()
+        self._by_context: Dict[str, List[str]] = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def has_context(self, context_key: str) -> bool:
+        return context_key in self._by_context
+
+    def find_similar(self, context_key: str, vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        keys = [k for k in self._by_context.get(context_key, []) if self._entries[k][1] is not None]
+        if not keys:
+            return None
+        matrix = np.stack([self._entries[k][1] for k in keys])
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return self.get(keys[best])
+
+    def put(self, key: str, context_key: str, vector: Optional[np.ndarray], response: Dict[str, Any]) -> None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._by_context.setdefault(context_key, []).append(key)
+        self._entries[key] = (context_key, vector, response)
+        while len(self._entries) > self.max_entries:
+            old_key, (old_context, _, _) = self._entries.popitem(last=False)
+            siblings = self._by_context[old_context]
+            siblings.remove(old_key)
+            if not siblings:
+                del self._by_context[old_context]
+
+
+async def _embed_answer(text: str) -> Optional[np.ndarray]:
+    """Return the unit-normalized embedding of an answer, or None if unavailable."""
+    try:
+        result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=text)
+    except Exception as e:
+        logger.warning("Answer embedding skipped: %s", e)
+        return None
+    vector = np.asarray(result["embedding"], dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
+
+
+# Static part of the evaluation prompt, built once at import. It leads every
+# request so the shared prefix is identical across calls; only the short
+# per-request suffix is assembled in _build_evaluation_prompt. Field names and
+# types come from the response schema, so the prompt only describes meaning.
+_PROMPT_PREFIX = """You are an expert interview coach. Score each answer 0-100 on:
+- overallScore
+- communication: clarity (clear, understandable), articulation (expresses ideas well), structure (organized, logical)
+- technical: accuracy (correct), depth (detailed, thorough), relevance (addresses the question)
+- behavioral: confidence (assured), examples (specific examples), storytelling (engaging, memorable)
+Also give 2-3 specific strengths, 2-3 improvements, 2-3 actionable nextSteps, and confidenceLevel.
+"""
+
+_ITEM_TEMPLATE = """Q ({}): {}
+A: {}
+"""
+
+
+def _build_evaluation_prompt(job_title: str, items: List[FeedbackItem]) -> str:
+    """Build the evaluation prompt for one answer, or for a batch of answers."""
+    if len(items) == 1:
+        q_snip, question_category, a_snip = items[0]
+        return f"{_PROMPT_PREFIX}Role: {job_title}\n{_ITEM_TEMPLATE.format(question_category, q_snip, a_snip)}"
+    blocks = "".join(
+        f"<ITEM {i}>\n{_ITEM_TEMPLATE.format(question_category, q_snip, a_snip)}</ITEM {i}>\n"
+        for i, (q_snip, question_category, a_snip) in enumerate(items, 1)
+    )
+    return (
+        f"{_PROMPT_PREFIX}Evaluate each item independently; return {len(items)} evaluations, "
+        f"each with item set to the number of the ITEM it evaluates.\n"
+        f"Role: {job_title}\n{blocks}"
+    )
+
+
+class CommunicationScores(BaseModel):
+    clarity: int
+    articulation: int
+    structure: int
+
+
+class TechnicalScores(BaseModel):
+    accuracy: int
+    depth: int
+    relevance: int
+
+
+class BehavioralScores(BaseModel):
+    confidence: int
+    examples: int
+    storytelling: int
+
+
+class FeedbackSchema(BaseModel):
+    """Evaluation of a single interview answer."""
+    overallScore: int
+    communication: CommunicationScores
+    technical: TechnicalScores
+    behavioral: BehavioralScores
+    strengths: List[str]
+    improvements: List[str]
+    nextSteps: List[str]
+    confidenceLevel: Literal["low", "medium", "high"]
+
+
+class BatchFeedbackSchema(FeedbackSchema):
+    """Evaluation of one answer in a batch, tagged with its ITEM number."""
+    item: int
+
+
+# Gemini returns schema-constrained JSON, so the response text parses as-is.
+# The schemas are converted to protos once here instead of on every call.
+_SINGLE_CONFIG = generation_types.to_generation_config_dict(genai.GenerationConfig(
+    response_mime_type="application/json", response_schema=FeedbackSchema))
+_BATCH_CONFIG = generation_types.to_generation_config_dict(genai.GenerationConfig(
+    response_mime_type="application/json", response_schema=list[BatchFeedbackSchema]))
+
+
+async def _generate(prompt: str, generation_config: Dict[str, Any]):
+    """Call Gemini under the concurrency cap, retrying 429/5xx with backoff."""
+    async with _gemini_semaphore:
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            try:
+                return await _model.generate_content_async(prompt, generation_config=generation_config)
+            except _RETRYABLE_ERRORS:
+                if attempt == GEMINI_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.25))
+
+
+async def _evaluate_batch(job_title: str, items: List[FeedbackItem]) -> List[Dict[str, Any]]:
+    """Evaluate a batch of answers with a single Gemini call, one result per item."""
+    single = len(items) == 1
+    response = await _generate(
+        _build_evaluation_prompt(job_title, items),
+        _SINGLE_CONFIG if single else _BATCH_CONFIG,
+    )
+    parsed = orjson.loads(response.text)
+    if single:
+        return [parsed]
+    # Results are matched to answers by item number, not position, so a
+    # reordered or partial batch never hands one answer another's evaluation
+    by_item = {r.get("item"): r for r in parsed if isinstance(r, dict)} if isinstance(parsed, list) else {}
+    results = [by_item.get(i) for i in range(1, len(items) + 1)]
+    if any(r is None for r in results) or len(parsed) != len(items):
+        raise Exception("AI batch response does not match the batch items")
+    return results
+
+
+class FeedbackBatcher:
+    """Coalesces concurrent evaluations into batched Gemini calls.
+
+    Each job title gets its own queue so the shared prompt prefix stays
+    identical within a batch. A queue's drain task exits once the queue runs
+    dry and is recreated by the next submission.
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: int) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, job_title: str, item: FeedbackItem) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(job_title)
+        if queue is None:
+            queue = self._queues[job_title] = asyncio.Queue()
+            self._spawn(self._drain(job_title, queue))
+        queue.put_nowait((item, future))
+        return await future
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, job_title: str, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            batch = [queue.get_nowait()]
+            if queue.qsize() < self.max_batch - 1:
+                await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            self._spawn(self._run(job_title, batch))
+        del self._queues[job_title]
+
+    async def _run(self, job_title: str, batch: list) -> None:
+        try:
+            results = await _evaluate_batch(job_title, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+# Sentiment and keywords are computed locally while Gemini scores the answer.
+# Set SENTIMENT_MODEL (e.g. distilbert-base-uncased-finetuned-sst-2-english)
+# to use a transformers classifier; otherwise a small lexicon is used.
+SENTIMENT_MODEL = os.getenv("SENTIMENT_MODEL")
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+_STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+both but by can could did do does doing done during each few for from further had has have
+having he her here hers him his how i if in into is it its itself just me more most my
+myself no nor not now of off on once only or other our ours out over own really same she
+should so some such than that the their theirs them then there these they this those
+through to too under until up very was we were what when where which while who whom why
+will with would you your yours yourself think thing things like get got make made use used
+using well also lot
+""".split())
+_POSITIVE_WORDS = frozenset("""
+achieved improved success successful successfully delivered led built solved efficient
+effective excellent great good strong enjoy enjoyed passionate confident proud learned
+growth reliable resolved optimized increased reduced collaborated
+""".split())
+_NEGATIVE_WORDS = frozenset("""
+failed failure bad poor difficult struggle struggled problem problems unfortunately never
+hate hated confused unsure worse worst broke broken mistake mistakes conflict blame
+""".split())
+
+_sentiment_pipeline = None
+
+
+def _extract_keywords(text: str, limit: int = 8) -> List[str]:
+    """Rank non-stopword terms by frequency, breaking ties by first occurrence."""
+    counts: Dict[str, int] = {}
+    for word in _WORD_RE.findall(text.lower()):
+        if len(word) > 2 and word not in _STOPWORDS:
+            counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=counts.__getitem__, reverse=True)[:limit]
+
+
+def _lexicon_sentiment(text: str) -> str:
+    words = _WORD_RE.findall(text.lower())
+    score = sum(w in _POSITIVE_WORDS for w in words) - sum(w in _NEGATIVE_WORDS for w in words)
+    if score > 0:
+        return "positive"
+    if score < 0:
+        return "negative"
+    return "neutral"
+
+
+def _load_sentiment_pipeline():
+    if not SENTIMENT_MODEL:
+        return None
+    try:
+        from transformers import pipeline  # type: ignore
+        return pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+    except Exception as e:
+        logger.warning("Local sentiment model unavailable, using lexicon: %s", e)
+        return None
+
+
+def _local_signals(answer: str) -> Tuple[str, List[str]]:
+    """Return (sentiment, keywords) for an answer without calling Gemini."""
+    if _sentiment_pipeline is not None:
+        label = _sentiment_pipeline(answer[:512])[0]["label"].lower()
+        sentiment = label if label in ("positive", "negative") else "neutral"
+    else:
+        sentiment = _lexicon_sentiment(answer)
+    return sentiment, _extract_keywords(answer)
+
+
+# Shared Gemini model, created once per worker in the lifespan handler. The
+# async API reuses the SDK's grpc.aio channel, so concurrent requests overlap
+# their network I/O on one pooled connection instead of blocking the loop.
+_model: Optional[genai.GenerativeModel] = None
+_batcher: Optional[FeedbackBatcher] = None
+_cache = FeedbackCache(FEEDBACK_CACHE_SIZE, FEEDBACK_SEMANTIC_THRESHOLD)
+_redis = None
+
+
+async def _shared_cache_get(key: str) -> Optional[bytes]:
+    if _redis is None:
+        return None
+    try:
+        return await _redis.get(REDIS_KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning("Redis cache lookup failed: %s", e)
+        return None
+
+
+async def _shared_cache_set(key: str, body: bytes) -> None:
+    if _redis is None:
+        return
+    try:
+        await _redis.setex(REDIS_KEY_PREFIX + key, FEEDBACK_CACHE_TTL, body)
+    except Exception as e:
+        logger.warning("Redis cache store failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _model, _batcher, _sentiment_pipeline, _redis
+    _sentiment_pipeline = _load_sentiment_pipeline()
+    _model = genai.GenerativeModel(model_name) if api_key else None
+    _batcher = FeedbackBatcher(FEEDBACK_MAX_BATCH, FEEDBACK_MAX_WAIT_MS)
+    if REDIS_URL and redis_asyncio is not None:
+        pool = redis_asyncio.ConnectionPool.from_url(REDIS_URL, max_connections=50)
+        _redis = redis_asyncio.Redis(connection_pool=pool)
+    yield
+    await _batcher.close()
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    _model = None
+    _batcher = None
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,182 +426,270 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response shape for AI evaluations. orjson serializes these slotted
+# dataclasses natively, in field order, without building intermediate dicts.
+@dataclass(slots=True)
+class Breakdown:
+    accuracy: int
+    completeness: float
+    clarity: int
+    relevance: int
+
+
+@dataclass(slots=True)
+class Categories:
+    technical: float
+    communication: float
+    problemSolving: float
+    confidence: int
+
+
+@dataclass(slots=True)
+class CommunicationDetail:
+    clarity: int
+    articulation: int
+    structure: int
+    overall: float
+
+
+@dataclass(slots=True)
+class TechnicalDetail:
+    accuracy: int
+    depth: int
+    relevance: int
+    overall: float
+
+
+@dataclass(slots=True)
+class BehavioralDetail:
+    confidence: int
+    examples: int
+    storytelling: int
+    overall: float
+
+
+@dataclass(slots=True)
+class OverallDetail:
+    score: int
+    strengths: List[str]
+    improvements: List[str]
+    sentiment: str
+
+
+@dataclass(slots=True)
+class DetailedFeedback:
+    communication: CommunicationDetail
+    technical: TechnicalDetail
+    behavioral: BehavioralDetail
+    overall: OverallDetail
+
+
+@dataclass(slots=True, kw_only=True)
+class ComprehensiveFeedback:
+    success: bool = True
+    score: int
+    feedback: str
+    suggestions: List[str]
+    keywords: List[str]
+    sentiment: str
+    breakdown: Breakdown
+    categories: Categories
+    detailedFeedback: DetailedFeedback
+    improvementAreas: List[str]
+    nextSteps: List[str]
+    confidenceLevel: str
+    questionCategory: str
+    expectedKeywords: List[str] = field(default_factory=list)
+    userKeywords: List[str]
+    keywordMatch: int = 75
+
+
+def _with_local_signals(cached: ComprehensiveFeedback, sentiment: str, keywords: List[str]) -> ComprehensiveFeedback:
+    """Reuse a similar answer's Gemini scores with this answer's own sentiment and keywords."""
+    detailed = cached.detailedFeedback
+    return replace(
+        cached,
+        keywords=keywords,
+        userKeywords=keywords,
+        sentiment=sentiment,
+        detailedFeedback=replace(detailed, overall=replace(detailed.overall, sentiment=sentiment)),
+    )
+
+
+# Fallback bodies are serialized once; only the question category varies, and
+# it is spliced into the pre-rendered bytes (JSON-escaped) per response.
+_FALLBACK_BODY = orjson.dumps({
+    "success": True,
+    "score": 75,
+    "feedback": "Enhanced feedback for __CATEGORY__ question. You provided relevant information and showed understanding of the topic.",
+    "suggestions": [
+        "Consider adding specific examples to strengthen your response",
+        "Try to quantify your achievements when possible",
+        "Make sure your answer directly addresses the question asked",
+        "Practice structuring your responses with clear beginning, middle, and end"
+    ],
+    "keywords": ["relevant", "understanding", "examples", "structure"],
+    "sentiment": "positive",
+    "breakdown": {"accuracy": 80, "completeness": 70, "clarity": 75, "relevance": 80},
+    "categories": {"technical": 70, "communication": 80, "problemSolving": 75, "confidence": 75},
+    "detailedFeedback": {
+        "communication": {"clarity": 75, "articulation": 80, "structure": 70, "overall": 75},
+        "technical": {"accuracy": 80, "depth": 70, "relevance": 80, "overall": 77},
+        "behavioral": {"confidence": 75, "examples": 70, "storytelling": 75, "overall": 73},
+        "overall": {"score": 75, "strengths": ["Good understanding of the topic", "Relevant information provided"], "improvements": ["Add specific examples", "Improve response structure"], "sentiment": "positive"}
+    },
+    "improvementAreas": ["Add specific examples", "Improve response structure"],
+    "nextSteps": ["Practice with STAR method", "Record and review responses"],
+    "confidenceLevel": "medium",
+    "questionCategory": "__CATEGORY__",
+    "expectedKeywords": [],
+    "userKeywords": ["relevant", "understanding", "examples"],
+    "keywordMatch": 75
+})
+
+
+@lru_cache(maxsize=64)
+def _error_body(message: str) -> bytes:
+    return orjson.dumps({
+        "success": False,
+        "error": message,
+        "score": 0,
+        "feedback": "Error occurred during evaluation."
+    })
+
+
 @app.post("/feedback")
 async def feedback(request: Request):
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         question = data.get("question", "")
         answer = data.get("answer", "")
         job_title = data.get("jobTitle", "Software Engineer")
         question_category = data.get("category", "general")
         
-        print(f"Evaluating answer for: {question[:50]}...")
-        print(f"Answer length: {len(answer)} characters")
-        print(f"Job title: {job_title}")
-        print(f"Category: {question_category}")
-        
-        # Use Gemini AI for comprehensive feedback analysis when API key exists
-        model = genai.GenerativeModel(model_name) if api_key else None
+        logger.debug(
+            "Evaluating answer for: %.50s... (answer length: %d, job title: %s, category: %s)",
+            question, len(answer), job_title, question_category,
+        )
         
-        # Create comprehensive evaluation prompt
         q_snip = question[:800]
         a_snip = answer[:1200]
-        evaluation_prompt = f"""
-        You are an expert interview coach evaluating a candidate's answer for a {job_title} position.
-        
-        Question: {q_snip}
-        Question Category: {question_category}
-        Candidate's Answer: {a_snip}
-        
-        Please provide a comprehensive evaluation with the following structure:
-        
-        1. Overall Score (0-100)
-        2. Communication Skills (0-100 each):
-           - Clarity: How clear and understandable is the response
-           - Articulation: How well the candidate expresses ideas
-           - Structure: How organized and logical the response is
-        
-        3. Technical Knowledge (0-100 each):
-           - Accuracy: How correct is the technical information
-           - Depth: How detailed and thorough is the knowledge
-           - Relevance: How relevant is the answer to the question
-        
-        4. Behavioral Assessment (0-100 each):
-           - Confidence: How confident and assured the candidate appears
-           - Examples: How well they provide specific examples
-           - Storytelling: How engaging and memorable their response is
-        
-        5. Strengths: List 2-3 specific strengths
-        6. Areas for Improvement: List 2-3 specific improvements
-        7. Next Steps: Provide 2-3 actionable next steps
-        8. Confidence Level: low/medium/high
-        9. Sentiment: positive/neutral/negative
-        10. Keywords: Extract 5-8 key terms from the answer
-        
-        Return the response as a JSON object with this exact structure:
-        {{
-            "overallScore": number,
-            "communication": {{"clarity": number, "articulation": number, "structure": number}},
-            "technical": {{"accuracy": number, "depth": number, "relevance": number}},
-            "behavioral": {{"confidence": number, "examples": number, "storytelling": number}},
-            "strengths": ["string1", "string2"],
-            "improvements": ["string1", "string2"],
-            "nextSteps": ["string1", "string2"],
-            "confidenceLevel": "low|medium|high",
-            "sentiment": "positive|neutral|negative",
-            "keywords": ["keyword1", "keyword2", "keyword3"]
-        }}
-        """
-        
+
+        context_key = _cache_key(job_title, question_category, q_snip)
+        exact_key = _cache_key(context_key, a_snip)
+        cached = _cache.get(exact_key)
+        if cached is None:
+            shared = await _shared_cache_get(exact_key)
+            if shared is not None:
+                logger.debug("Serving shared cached AI evaluation")
+                return Response(shared, media_type="application/json")
+        if cached is not None:
+            logger.debug("Serving cached AI evaluation")
+            return ORJSONResponse(cached)
+        # The embedding only delays the request when a cached answer to this
+        # question could match; otherwise it runs alongside the Gemini call
+        semantic = _model is not None and FEEDBACK_SEMANTIC_THRESHOLD <= 1.0
+        answer_vector = None
+        if semantic and _cache.has_context(context_key):
+            answer_vector = await _embed_answer(a_snip)
+            similar = _cache.find_similar(context_key, answer_vector) if answer_vector is not None else None
+            if similar is not None:
+                logger.debug("Serving semantically cached AI evaluation")
+                sentiment, keywords = await asyncio.to_thread(_local_signals, a_snip)
+                return ORJSONResponse(_with_local_signals(similar, sentiment, keywords))
+
         try:
-            if model is not None:
-                response = model.generate_content(evaluation_prompt)
-                ai_feedback = response.text
-                start_idx = ai_feedback.find('{')
-                end_idx = ai_feedback.rfind('}') + 1
-                if start_idx != -1 and end_idx != -1:
-                    json_content = ai_feedback[start_idx:end_idx]
-                    parsed_feedback = json.loads(json_content)
-                    comm_avg = sum(parsed_feedback['communication'].values()) / 3
-                    tech_avg = sum(parsed_feedback['technical'].values()) / 3
-                    behav_avg = sum(parsed_feedback['behavioral'].values()) / 3
-                    comprehensive_feedback = {
-                        "success": True,
-                        "score": parsed_feedback.get('overallScore', 75),
-                        "feedback": f"Comprehensive evaluation for {question_category} question. Overall performance: {parsed_feedback.get('overallScore', 75)}/100",
-                        "suggestions": parsed_feedback.get('improvements', []),
-                        "keywords": parsed_feedback.get('keywords', []),
-                        "sentiment": parsed_feedback.get('sentiment', 'neutral'),
-                        "breakdown": {
-                            "accuracy": parsed_feedback.get('technical', {}).get('accuracy', 70),
-                            "completeness": tech_avg,
-                            "clarity": parsed_feedback.get('communication', {}).get('clarity', 70),
-                            "relevance": parsed_feedback.get('technical', {}).get('relevance', 70)
-                        },
-                        "categories": {
-                            "technical": tech_avg,
-                            "communication": comm_avg,
-                            "problemSolving": tech_avg,
-                            "confidence": parsed_feedback.get('behavioral', {}).get('confidence', 70)
-                        },
-                        "detailedFeedback": {
-                            "communication": {
-                                "clarity": parsed_feedback.get('communication', {}).get('clarity', 70),
-                                "articulation": parsed_feedback.get('communication', {}).get('articulation', 70),
-                                "structure": parsed_feedback.get('communication', {}).get('structure', 70),
-                                "overall": comm_avg
-                            },
-                            "technical": {
-                                "accuracy": parsed_feedback.get('technical', {}).get('accuracy', 70),
-                                "depth": parsed_feedback.get('technical', {}).get('depth', 70),
-                                "relevance": parsed_feedback.get('technical', {}).get('relevance', 70),
-                                "overall": tech_avg
-                            },
-                            "behavioral": {
-                                "confidence": parsed_feedback.get('behavioral', {}).get('confidence', 70),
-                                "examples": parsed_feedback.get('behavioral', {}).get('examples', 70),
-                                "storytelling": parsed_feedback.get('behavioral', {}).get('storytelling', 70),
-                                "overall": behav_avg
-                            },
-                            "overall": {
-                                "score": parsed_feedback.get('overallScore', 75),
-                                "strengths": parsed_feedback.get('strengths', []),
-                                "improvements": parsed_feedback.get('improvements', []),
-                                "sentiment": parsed_feedback.get('sentiment', 'neutral')
-                            }
-                        },
-                        "improvementAreas": parsed_feedback.get('improvements', []),
-                        "nextSteps": parsed_feedback.get('nextSteps', []),
-                        "confidenceLevel": parsed_feedback.get('confidenceLevel', 'medium'),
-                        "questionCategory": question_category,
-                        "expectedKeywords": [],
-                        "userKeywords": parsed_feedback.get('keywords', []),
-                        "keywordMatch": 75
-                    }
-                    print(f"AI evaluation successful. Overall score: {comprehensive_feedback['score']}")
-                    return JSONResponse(comprehensive_feedback)
+            if _model is not None and _batcher is not None:
+                pending = [
+                    _batcher.submit(job_title, (q_snip, question_category, a_snip)),
+                    asyncio.to_thread(_local_signals, a_snip),
+                ]
+                if semantic and answer_vector is None:
+                    pending.append(_embed_answer(a_snip))
+                parsed_feedback, (sentiment, keywords), *embedded = await asyncio.gather(*pending)
+                if embedded:
+                    answer_vector = embedded[0]
+                if isinstance(parsed_feedback, dict):
+                    comm = parsed_feedback['communication']
+                    tech = parsed_feedback['technical']
+                    behav = parsed_feedback['behavioral']
+                    comm_avg = sum(comm.values()) / 3
+                    tech_avg = sum(tech.values()) / 3
+                    behav_avg = sum(behav.values()) / 3
+                    overall_score = parsed_feedback.get('overallScore', 75)
+                    improvements = parsed_feedback.get('improvements', [])
+                    accuracy = tech.get('accuracy', 70)
+                    relevance = tech.get('relevance', 70)
+                    clarity = comm.get('clarity', 70)
+                    confidence = behav.get('confidence', 70)
+                    comprehensive_feedback = ComprehensiveFeedback(
+                        score=overall_score,
+                        feedback=f"Comprehensive evaluation for {question_category} question. Overall performance: {overall_score}/100",
+                        suggestions=improvements,
+                        keywords=keywords,
+                        sentiment=sentiment,
+                        breakdown=Breakdown(
+                            accuracy=accuracy,
+                            completeness=tech_avg,
+                            clarity=clarity,
+                            relevance=relevance,
+                        ),
+                        categories=Categories(
+                            technical=tech_avg,
+                            communication=comm_avg,
+                            problemSolving=tech_avg,
+                            confidence=confidence,
+                        ),
+                        detailedFeedback=DetailedFeedback(
+                            communication=CommunicationDetail(
+                                clarity=clarity,
+                                articulation=comm.get('articulation', 70),
+                                structure=comm.get('structure', 70),
+                                overall=comm_avg,
+                            ),
+                            technical=TechnicalDetail(
+                                accuracy=accuracy,
+                                depth=tech.get('depth', 70),
+                                relevance=relevance,
+                                overall=tech_avg,
+                            ),
+                            behavioral=BehavioralDetail(
+                                confidence=confidence,
+                                examples=behav.get('examples', 70),
+                                storytelling=behav.get('storytelling', 70),
+                                overall=behav_avg,
+                            ),
+                            overall=OverallDetail(
+                                score=overall_score,
+                                strengths=parsed_feedback.get('strengths', []),
+                                improvements=improvements,
+                                sentiment=sentiment,
+                            ),
+                        ),
+                        improvementAreas=improvements,
+                        nextSteps=parsed_feedback.get('nextSteps', []),
+                        confidenceLevel=parsed_feedback.get('confidenceLevel', 'medium'),
+                        questionCategory=question_category,
+                        userKeywords=keywords,
+                    )
+                    logger.debug("AI evaluation successful. Overall score: %s", overall_score)
+                    _cache.put(exact_key, context_key, answer_vector, comprehensive_feedback)
+                    body = orjson.dumps(comprehensive_feedback)
+                    await _shared_cache_set(exact_key, body)
+                    return Response(body, media_type="application/json")
                 else:
                     raise Exception("AI response format invalid")
             else:
                 raise Exception("No API key configured; using fallback")
         except Exception as ai_error:
-            print(f"AI evaluation failed: {str(ai_error)}")
-            return JSONResponse({
-                "success": True,
-                "score": 75,
-                "feedback": f"Enhanced feedback for {question_category} question. You provided relevant information and showed understanding of the topic.",
-                "suggestions": [
-                    "Consider adding specific examples to strengthen your response",
-                    "Try to quantify your achievements when possible",
-                    "Make sure your answer directly addresses the question asked",
-                    "Practice structuring your responses with clear beginning, middle, and end"
-                ],
-                "keywords": ["relevant", "understanding", "examples", "structure"],
-                "sentiment": "positive",
-                "breakdown": {"accuracy": 80, "completeness": 70, "clarity": 75, "relevance": 80},
-                "categories": {"technical": 70, "communication": 80, "problemSolving": 75, "confidence": 75},
-                "detailedFeedback": {
-                    "communication": {"clarity": 75, "articulation": 80, "structure": 70, "overall": 75},
-                    "technical": {"accuracy": 80, "depth": 70, "relevance": 80, "overall": 77},
-                    "behavioral": {"confidence": 75, "examples": 70, "storytelling": 75, "overall": 73},
-                    "overall": {"score": 75, "strengths": ["Good understanding of the topic", "Relevant information provided"], "improvements": ["Add specific examples", "Improve response structure"], "sentiment": "positive"}
-                },
-                "improvementAreas": ["Add specific examples", "Improve response structure"],
-                "nextSteps": ["Practice with STAR method", "Record and review responses"],
-                "confidenceLevel": "medium",
-                "questionCategory": question_category,
-                "expectedKeywords": [],
-                "userKeywords": ["relevant", "understanding", "examples"],
-                "keywordMatch": 75
-            })
+            logger.warning("AI evaluation failed: %s", ai_error)
+            return Response(
+                _FALLBACK_BODY.replace(b"__CATEGORY__", orjson.dumps(str(question_category))[1:-1]),
+                media_type="application/json",
+            )
     except Exception as e:
-        print(f"Error in feedback: {str(e)}")
-        return JSONResponse({
-            "success": False,
-            "error": str(e),
-            "score": 0,
-            "feedback": "Error occurred during evaluation."
-        })
+        logger.error("Error in feedback: %s", e)
+        return Response(_error_body(str(e)), media_type="application/json")
 
 @app.get("/health")
 async def health_check():
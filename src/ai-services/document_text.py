@@ -0,0 +1,76 @@
+"""
+Text extraction for uploaded PDF/DOCX resumes.
+
+Kept apart from resume_parser so the extraction pool's workers import only the
+document libraries, not FastAPI, Gemini or torch.
+"""
+import io
+import logging
+import os
+from typing import Any, Iterable, Iterator, List
+
+import PyPDF2
+from docx import Document
+
+try:
+    import pypdfium2 as pdfium  # PDFium (C++) text extraction; PyPDF2 is the fallback
+except ImportError:
+    pdfium = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Extraction stops once this many characters are collected (0 = whole document);
+# the prompt only uses the first 4000, so 2x leaves headroom for the ML parser
+EXTRACT_CHAR_LIMIT = int(os.getenv("RESUME_EXTRACT_CHARS", "8000"))
+
+
+def _join_until(texts: Iterable[str]) -> str:
+    """Newline-join page/paragraph texts, stopping early at EXTRACT_CHAR_LIMIT."""
+    parts: List[str] = []
+    total = 0
+    for text in texts:
+        parts.append(text)
+        total += len(text) + 1
+        if EXTRACT_CHAR_LIMIT and total >= EXTRACT_CHAR_LIMIT:
+            break
+    return "\n".join(parts).strip()
+
+
+def extract_text_from_pdf(content: bytes | str) -> str:
+    """Extract text from PDF content (bytes or a file path)"""
+    try:
+        if pdfium is not None:
+            return _extract_text_pdfium(content)
+        pdf_reader = PyPDF2.PdfReader(content if isinstance(content, str) else io.BytesIO(content))
+        return _join_until(page.extract_text() or "" for page in pdf_reader.pages)
+    except Exception as e:
+        logger.error("Error extracting PDF text: %s", e)
+        raise Exception(f"Failed to extract PDF text: {str(e)}")
+
+
+def _extract_text_pdfium(content: bytes | str) -> str:
+    pdf = pdfium.PdfDocument(content)
+    try:
+        return _join_until(_pdfium_page_texts(pdf))
+    finally:
+        pdf.close()
+
+
+def _pdfium_page_texts(pdf: Any) -> Iterator[str]:
+    for page in pdf:
+        textpage = page.get_textpage()
+        try:
+            yield textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+
+def extract_text_from_docx(content: bytes | str) -> str:
+    """Extract text from DOCX content (bytes or a file path)"""
+    try:
+        doc = Document(content if isinstance(content, str) else io.BytesIO(content))
+        return _join_until(paragraph.text for paragraph in doc.paragraphs)
+    except Exception as e:
+        logger.error("Error extracting DOCX text: %s", e)
+        raise Exception(f"Failed to extract DOCX text: {str(e)}")
@@ -1,48 +1,125 @@
 import argparse
-import json
-from typing import Dict, Any
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Any, BinaryIO, Iterator, List, Optional, Tuple
 
+import orjson
 
-def transform(record: Dict[str, Any]) -> Dict[str, Any]:
-    """Map raw record to supervised example.
-    Expected keys (flexible): question, answer, score, categories -> {technical, communication, behavioral}
-    Output: {text, label, score}
-    """
-    question = (record.get("question") or "").strip()
-    answer = (record.get("answer") or record.get("userAnswer") or "").strip()
-    text = f"Question: {question}\nAnswer: {answer}".strip()
+# Records are transformed BATCH_SIZE lines at a time; output is accumulated
+# and flushed in ~1 MiB chunks rather than per line.
+BATCH_SIZE = 10_000
+WRITE_BUFFER_BYTES = 1 << 20
 
-    # derive label from categories (pick highest)
-    label = "general"
-    categories = record.get("categories") or {}
+
+def _argmax_label(categories: Any) -> str:
+    """Pick the highest-scoring category name, defaulting to "general"."""
     if isinstance(categories, dict) and categories:
-        label = max(categories, key=lambda k: categories.get(k) or 0)
+        return max(categories, key=lambda k: categories.get(k) or 0)
+    return "general"
+
 
-    score = record.get("score") or 0
+def _to_int(value: Any) -> int:
     try:
-        score = int(score)
+        return int(value or 0)
     except Exception:
-        score = 0
+        return 0
+
+
+def transform_batch(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Map a batch of raw records to supervised examples in a single pass.
+    Expected keys (flexible): question, answer, score, categories -> {technical, communication, behavioral}
+    Output: [{text, label, score}, ...]
+    """
+    return [
+        {
+            "text": f"Question: {(r.get('question') or '').strip()}\nAnswer: {(r.get('answer') or r.get('userAnswer') or '').strip()}".strip(),
+            # derive label from categories (pick highest)
+            "label": _argmax_label(r.get("categories")),
+            "score": _to_int(r.get("score")),
+        }
+        for r in records
+    ]
+
+
+def transform(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Map raw record to supervised example."""
+    return transform_batch([record])[0]
+
+
+def _read_lines(f_in: BinaryIO, end: int) -> Iterator[bytes]:
+    while f_in.tell() < end:
+        line = f_in.readline()
+        if not line:
+            break
+        yield line
+
+
+def convert_range(input_path: str, output_path: str, start: int = 0, end: Optional[int] = None) -> None:
+    """Transform the lines of `input_path` that begin within [start, end) into `output_path`."""
+    buf = bytearray()
+    with open(input_path, "rb") as f_in, open(output_path, "wb") as f_out:
+        f_in.seek(start)
+        lines = _read_lines(f_in, os.path.getsize(input_path) if end is None else end)
+        while True:
+            chunk = list(islice(lines, BATCH_SIZE))
+            if not chunk:
+                break
+            raws = [orjson.loads(line) for line in chunk if line.strip()]
+            for ex in transform_batch(raws):
+                buf += orjson.dumps(ex)
+                buf += b"\n"
+            if len(buf) >= WRITE_BUFFER_BYTES:
+                f_out.write(buf)
+                buf.clear()
+        f_out.write(buf)
+
 
-    return {"text": text, "label": label, "score": score}
+def _shard_bounds(path: str, workers: int) -> List[Tuple[int, int]]:
+    """Split a file into up to `workers` byte ranges aligned to line starts."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, workers):
+            f.seek(size * i // workers)
+            f.readline()
+            bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _convert_shard(job: Tuple[str, str, int, int]) -> str:
+    input_path, part_path, start, end = job
+    convert_range(input_path, part_path, start, end)
+    return part_path
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", required=True)
     parser.add_argument("--output", required=True)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (default: 1)")
     args = parser.parse_args()
 
-    with open(args.input, "r", encoding="utf-8") as f_in, open(args.output, "w", encoding="utf-8") as f_out:
-        for line in f_in:
-            if not line.strip():
-                continue
-            raw = json.loads(line)
-            ex = transform(raw)
-            f_out.write(json.dumps(ex, ensure_ascii=False) + "\n")
+    if args.workers <= 1:
+        convert_range(args.input, args.output)
+        return
+
+    # Each worker converts one line-aligned byte range into its own part file;
+    # the parts are then concatenated in order.
+    jobs = [
+        (args.input, f"{args.output}.part-{i}", start, end)
+        for i, (start, end) in enumerate(_shard_bounds(args.input, args.workers))
+    ]
+    with ProcessPoolExecutor(max_workers=len(jobs) or 1) as pool:
+        parts = list(pool.map(_convert_shard, jobs))
+    with open(args.output, "wb") as f_out:
+        for part in parts:
+            with open(part, "rb") as f_part:
+                shutil.copyfileobj(f_part, f_out)
+            os.remove(part)
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -5,48 +5,77 @@ Extracts skills, experience summary, education level, experience years, and comp
 import argparse
 import json
 import os
-from typing import Dict, Any, List
+from contextlib import nullcontext
+from multiprocessing import Pool
+from typing import Dict, Any, List, Callable, Optional, Tuple
 from datetime import datetime
+from operator import itemgetter
 import re
+import zlib
+
+import numpy as np
+
+try:
+    import simdjson  # optional SIMD-accelerated JSON decoder
+except ImportError:
+    simdjson = None  # type: ignore
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+WRITE_BUFFER_BYTES = 1 << 20
+
+# Precompiled once; these run per experience / per responsibility line.
+_DURATION_RE = re.compile(r'(\d+)\s*(year|month)')
+_QUANT_RE = re.compile(r'\d+%|\d+\+|\d+\s*(?:users|clients|projects|years)', re.IGNORECASE)
+
+# Priority order: Ph.D > M.E/M.S > B.E/B.S > Diploma > Others
+_EDU_PRIORITY = {"phd": 5, "ph.d": 5, "doctorate": 5, "me": 4, "m.e": 4, "ms": 4, "m.s": 4,
+                 "master": 4, "be": 3, "b.e": 3, "bs": 3, "b.s": 3, "bachelor": 3,
+                 "diploma": 2, "hsc": 1, "ssc": 1}
+# Quality-score points per education level (0-10)
+_EDU_POINTS = {"phd": 10, "ph.d": 10, "doctorate": 10, "me": 8, "m.e": 8,
+               "ms": 8, "m.s": 8, "master": 8, "be": 6, "b.e": 6,
+               "bs": 6, "b.s": 6, "bachelor": 6, "diploma": 3}
+_by_priority = itemgetter(1)
+
+# Placeholder values the source dataset uses for missing fields
+_SENTINELS = frozenset({"unknown", "not provided", ""})
+_DURATION_SENTINELS = _SENTINELS | {"present"}
+
+
+# Technical skill categories, in the order skills are collected
+_TECH_CATEGORIES = ("programming_languages", "frameworks", "databases", "cloud",
+                    "project_management", "automation", "software_tools")
+
+
+def _valid(s: str) -> bool:
+    """True for a non-empty field that is not a placeholder."""
+    return bool(s) and s.lower() not in _SENTINELS
+
+
+def _make_decoder() -> Callable[[bytes], Any]:
+    """Return a JSON decoder for one line, reusing a single simdjson parser if available."""
+    if simdjson is None:
+        return json.loads
+    parser = simdjson.Parser()
+    return lambda line: parser.parse(line, True)
 
 
 def extract_skills(resume: Dict[str, Any]) -> List[str]:
-    """Extract all technical skills from resume."""
-    skills = []
+    """Extract all technical skills from resume, deduplicated in first-seen order."""
+    skills: Dict[str, None] = {}
     technical = resume.get("skills", {}).get("technical", {})
     
-    # Programming languages
-    for lang in technical.get("programming_languages", []):
-        name = lang.get("name", "").strip()
-        if name and name.lower() not in ["unknown", "not provided", ""]:
-            skills.append(name)
-    
-    # Frameworks
-    for fw in technical.get("frameworks", []):
-        name = fw.get("name", "").strip()
-        if name and name.lower() not in ["unknown", "not provided", ""]:
-            skills.append(name)
-    
-    # Databases
-    for db in technical.get("databases", []):
-        name = db.get("name", "").strip()
-        if name and name.lower() not in ["unknown", "not provided", ""]:
-            skills.append(name)
-    
-    # Cloud
-    for cloud in technical.get("cloud", []):
-        name = cloud.get("name", "").strip()
-        if name and name.lower() not in ["unknown", "not provided", ""]:
-            skills.append(name)
-    
-    # Other technical skills (project_management, automation, software_tools, etc.)
-    for category in ["project_management", "automation", "software_tools"]:
-        for item in technical.get(category, []):
+    for category in _TECH_CATEGORIES:
+        for item in technical.get(category, ()):
             name = item.get("name", "").strip()
-            if name and name.lower() not in ["unknown", "not provided", ""]:
-                skills.append(name)
+            if _valid(name):
+                skills[name] = None
     
-    return list(set(skills))  # Remove duplicates
+    return list(skills)
 
 
 def extract_experience_summary(resume: Dict[str, Any]) -> str:
@@ -57,7 +86,7 @@ def extract_experience_summary(resume: Dict[str, Any]) -> str:
     for exp in experiences:
         title = exp.get("title", "").strip()
         company = exp.get("company", "").strip()
-        if title and company and title.lower() not in ["unknown", "not provided"]:
+        if company and _valid(title):
             summary_parts.append(f"{title} at {company}")
     
     return ", ".join(summary_parts[:5])  # Limit to top 5
@@ -69,24 +98,34 @@ def extract_education_level(resume: Dict[str, Any]) -> str:
     if not education_list:
         return "Unknown"
     
-    # Priority order: Ph.D > M.E/M.S > B.E/B.S > Diploma > Others
-    degree_levels = []
+    # (level, priority) pairs, lowercasing each level once
+    candidates = []
     for edu in education_list:
         degree = edu.get("degree", {})
         level = degree.get("level", "").strip()
-        if level and level.lower() not in ["unknown", "not provided", ""]:
-            degree_levels.append(level)
+        lowered = level.lower()
+        if lowered not in _SENTINELS:
+            candidates.append((level, _EDU_PRIORITY.get(lowered, 0)))
     
-    if not degree_levels:
+    if not candidates:
         return "Unknown"
     
     # Return highest level found
-    priority = {"phd": 5, "ph.d": 5, "doctorate": 5, "me": 4, "m.e": 4, "ms": 4, "m.s": 4, 
-                "master": 4, "be": 3, "b.e": 3, "bs": 3, "b.s": 3, "bachelor": 3,
-                "diploma": 2, "hsc": 1, "ssc": 1}
-    
-    highest = max(degree_levels, key=lambda d: priority.get(d.lower(), 0))
-    return highest
+    return max(candidates, key=_by_priority)[0]
+
+
+def _year_month(s: str) -> int:
+    """Months since year 0 for a "YYYY-MM..." date; raises ValueError like strptime would."""
+    if s[4:5] != "-":
+        raise ValueError(f"unconverted date: {s!r}")
+    month = int(s[5:7])
+    if not 1 <= month <= 12:
+        raise ValueError(f"month out of range: {s!r}")
+    return int(s[0:4]) * 12 + month
+
+
+_TODAY = datetime.now()
+_NOW_YM = _TODAY.year * 12 + _TODAY.month  # "present" end dates, computed once per process
 
 
 def calculate_experience_years(resume: Dict[str, Any]) -> float:
@@ -101,28 +140,35 @@ def calculate_experience_years(resume: Dict[str, Any]) -> float:
         duration = dates.get("duration", "")
         
         # Try to parse duration string
-        if duration and duration.lower() not in ["unknown", "not provided", "present"]:
-            # Extract years from duration (e.g., "2 years", "1 year 6 months")
-            year_match = re.search(r'(\d+)\s*year', duration.lower())
-            month_match = re.search(r'(\d+)\s*month', duration.lower())
+        if duration and duration.lower() not in _DURATION_SENTINELS:
+            # Extract years from duration (e.g., "2 years", "1 year 6 months");
+            # one scan, first year and first month amount only
+            years = months = None
+            for match in _DURATION_RE.finditer(duration.lower()):
+                if match.group(2) == "year":
+                    if years is None:
+                        years = match.group(1)
+                elif months is None:
+                    months = match.group(1)
+                if years is not None and months is not None:
+                    break
             
-            if year_match:
-                total_years += float(year_match.group(1))
-            if month_match:
-                total_years += float(month_match.group(1)) / 12.0
+            if years is not None:
+                total_years += float(years)
+            if months is not None:
+                total_years += float(months) / 12.0
         
         # Try to parse start/end dates
-        elif start and end and start.lower() not in ["unknown", "not provided"]:
+        elif end and _valid(start):
             try:
                 # Format: "2017-08" or "2017-08-01"
-                start_date = datetime.strptime(start[:7], "%Y-%m")
+                start_m = _year_month(start)
                 if end.lower() in ["present", "current", ""]:
-                    end_date = datetime.now()
+                    end_m = _NOW_YM
                 else:
-                    end_date = datetime.strptime(end[:7], "%Y-%m")
+                    end_m = _year_month(end)
                 
-                delta = end_date - start_date
-                total_years += delta.days / 365.25
+                total_years += (end_m - start_m) / 12.0
             except (ValueError, TypeError):
                 pass
     
@@ -165,21 +211,11 @@ def calculate_quality_score(resume: Dict[str, Any], skills: List[str],
     experiences = resume.get("experience", [])
     projects = resume.get("projects", [])
     
-    # Check for quantifiable results in responsibilities
-    has_quantifiable = False
-    for exp in experiences:
-        responsibilities = exp.get("responsibilities", [])
-        for resp in responsibilities:
-            if re.search(r'\d+%|\d+\+|\d+\s*(users|clients|projects|years)', resp.lower()):
-                has_quantifiable = True
-                break
-    
-    # Check project impact
-    has_project_impact = False
-    for proj in projects:
-        impact = proj.get("impact", "")
-        if impact and impact.lower() not in ["unknown", "not provided", ""]:
-            has_project_impact = True
+    # Quantifiable results in responsibilities / project impact; both stop at the first hit
+    has_quantifiable = any(_QUANT_RE.search(resp)
+                           for exp in experiences
+                           for resp in exp.get("responsibilities", ()))
+    has_project_impact = any(_valid(proj.get("impact", "")) for proj in projects)
     
     if has_quantifiable and has_project_impact:
         score += 25
@@ -191,16 +227,12 @@ def calculate_quality_score(resume: Dict[str, Any], skills: List[str],
         score += 5
     
     # Education & certifications (0-10 points)
-    education_priority = {"phd": 10, "ph.d": 10, "doctorate": 10, "me": 8, "m.e": 8, 
-                         "ms": 8, "m.s": 8, "master": 8, "be": 6, "b.e": 6, 
-                         "bs": 6, "b.s": 6, "bachelor": 6, "diploma": 3}
-    
-    edu_score = education_priority.get(education_level.lower(), 0)
+    edu_score = _EDU_POINTS.get(education_level.lower(), 0)
     score += edu_score
     
     # Certifications bonus
     certs = resume.get("certifications", [])
-    if isinstance(certs, str) and certs.strip() and certs.lower() not in ["unknown", "not provided"]:
+    if isinstance(certs, str) and certs.strip() and certs.lower() not in _SENTINELS:
         score += 2
     elif isinstance(certs, list) and len(certs) > 0:
         score += min(2, len(certs))
@@ -226,7 +258,7 @@ def flatten_resume_to_text(resume: Dict[str, Any]) -> str:
     
     # Summary
     summary = resume.get("personal_info", {}).get("summary", "")
-    if summary and summary.lower() not in ["unknown", "not provided"]:
+    if _valid(summary):
         parts.append(f"Summary: {summary}")
     
     # Experience
@@ -239,7 +271,7 @@ def flatten_resume_to_text(resume: Dict[str, Any]) -> str:
         if title and company:
             parts.append(f"Experience: {title} at {company}")
             for resp in responsibilities[:3]:  # Top 3 responsibilities
-                if resp and resp.lower() not in ["unknown", "not provided"]:
+                if _valid(resp):
                     parts.append(f"  - {resp}")
     
     # Skills
@@ -268,16 +300,20 @@ def flatten_resume_to_text(resume: Dict[str, Any]) -> str:
     for proj in projects[:3]:  # Top 3 projects
         name = proj.get("name", "")
         description = proj.get("description", "")
-        if name and name.lower() not in ["unknown", "not provided"]:
+        if _valid(name):
             parts.append(f"Project: {name}")
-            if description and description.lower() not in ["unknown", "not provided"]:
+            if _valid(description):
                 parts.append(f"  {description}")
     
     return "\n".join(parts)
 
 
 def transform_resume(resume: Dict[str, Any]) -> Dict[str, Any]:
-    """Transform a single resume JSON to training example."""
+    """Transform a single resume JSON to training example.
+
+    The result holds only strings, numbers and new lists, never subtrees of
+    ``resume``, so the raw dict can be released as soon as this returns.
+    """
     skills = extract_skills(resume)
     experience_summary = extract_experience_summary(resume)
     education_level = extract_education_level(resume)
@@ -295,12 +331,49 @@ def transform_resume(resume: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+_decode: Optional[Callable[[bytes], Any]] = None
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode one example as a compact UTF-8 JSON line body."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _is_train(line_num: int, val_split: float) -> bool:
+    """Deterministically route a source line to train or val by hashing its line number."""
+    return (zlib.crc32(line_num.to_bytes(8, "little")) & 0xFFFF) >= int(0xFFFF * val_split)
+
+
+def _process_line(job: Tuple[int, bytes]) -> Tuple[int, Optional[Dict[str, Any]], Optional[str]]:
+    """Decode and transform one JSONL line. Returns (line_num, example or None, warning or None)."""
+    global _decode
+    if _decode is None:
+        _decode = _make_decoder()
+    line_num, line = job
+    try:
+        resume = _decode(line)
+    except ValueError as e:
+        return line_num, None, f"Warning: Skipping line {line_num} due to JSON error: {e}"
+    try:
+        transformed = transform_resume(resume)
+    except Exception as e:
+        return line_num, None, f"Warning: Skipping line {line_num} due to error: {e}"
+    # Skip if text is too short or missing critical info
+    if len(transformed["text"].strip()) < 50:
+        return line_num, None, None
+    return line_num, transformed, None
+
+
 def main():
     parser = argparse.ArgumentParser(description="Prepare resume dataset for training")
     parser.add_argument("--input", required=True, help="Input JSONL file (master_resumes.jsonl)")
     parser.add_argument("--output", required=True, help="Output training JSONL file")
     parser.add_argument("--val_output", required=True, help="Output validation JSONL file")
     parser.add_argument("--val_split", type=float, default=0.2, help="Validation split ratio (default: 0.2)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes for parsing (default: CPU count)")
     args = parser.parse_args()
     
     if not os.path.exists(args.input):
@@ -308,63 +381,54 @@ def main():
         return
     
     print(f"Reading resumes from {args.input}...")
-    examples = []
-    
-    with open(args.input, "r", encoding="utf-8") as f:
-        for line_num, line in enumerate(f, 1):
-            if not line.strip():
+    print(f"Writing training set to {args.output}...")
+    print(f"Writing validation set to {args.val_output}...")
+    # Only the per-example stats are kept in memory
+    scores: List[int] = []
+    skill_counts: List[int] = []
+    train_count = val_count = 0
+    
+    # Lines are decoded and transformed in worker processes and each example is
+    # written straight to train or val, chosen by a hash of its line number.
+    with open(args.input, "rb") as f, \
+            open(args.output, "wb", buffering=WRITE_BUFFER_BYTES) as train_f, \
+            open(args.val_output, "wb", buffering=WRITE_BUFFER_BYTES) as val_f, \
+            (Pool(args.workers) if args.workers > 1 else nullcontext()) as pool:
+        jobs = ((line_num, line) for line_num, line in enumerate(f, 1) if line.strip())
+        results = pool.imap(_process_line, jobs, chunksize=256) if pool else map(_process_line, jobs)
+        for line_num, transformed, warning in results:
+            if warning:
+                print(warning)
+            if transformed is None:
                 continue
             
-            try:
-                resume = json.loads(line)
-                transformed = transform_resume(resume)
-                
-                # Skip if text is too short or missing critical info
-                if len(transformed["text"].strip()) < 50:
-                    continue
-                
-                examples.append(transformed)
-                
-                if line_num % 100 == 0:
-                    print(f"Processed {line_num} resumes...")
-            except json.JSONDecodeError as e:
-                print(f"Warning: Skipping line {line_num} due to JSON error: {e}")
-                continue
-            except Exception as e:
-                print(f"Warning: Skipping line {line_num} due to error: {e}")
-                continue
-    
-    print(f"Total examples: {len(examples)}")
-    
-    # Split train/val
-    split_idx = int(len(examples) * (1 - args.val_split))
-    train_examples = examples[:split_idx]
-    val_examples = examples[split_idx:]
-    
-    print(f"Train examples: {len(train_examples)}")
-    print(f"Val examples: {len(val_examples)}")
-    
-    # Write training set
-    print(f"Writing training set to {args.output}...")
-    with open(args.output, "w", encoding="utf-8") as f:
-        for ex in train_examples:
-            f.write(json.dumps(ex, ensure_ascii=False) + "\n")
+            if _is_train(line_num, args.val_split):
+                out = train_f
+                train_count += 1
+            else:
+                out = val_f
+                val_count += 1
+            out.write(_dumps(transformed))
+            out.write(b"\n")
+            scores.append(transformed["score"])
+            skill_counts.append(len(transformed["skills"]))
+            
+            if line_num % 100 == 0:
+                print(f"Processed {line_num} resumes...")
     
-    # Write validation set
-    print(f"Writing validation set to {args.val_output}...")
-    with open(args.val_output, "w", encoding="utf-8") as f:
-        for ex in val_examples:
-            f.write(json.dumps(ex, ensure_ascii=False) + "\n")
+    print(f"Total examples: {len(scores)}")
+    print(f"Train examples: {train_count}")
+    print(f"Val examples: {val_count}")
     
     # Print statistics
-    scores = [ex["score"] for ex in examples]
-    skill_counts = [len(ex["skills"]) for ex in examples]
+    scores = np.asarray(scores, dtype=np.int16)
+    skill_counts = np.asarray(skill_counts, dtype=np.int32)
     
     print("\nDataset Statistics:")
-    print(f"  Average score: {sum(scores) / len(scores):.1f}")
-    print(f"  Score range: {min(scores)} - {max(scores)}")
-    print(f"  Average skills per resume: {sum(skill_counts) / len(skill_counts):.1f}")
-    print(f"  Max skills: {max(skill_counts)}")
+    print(f"  Average score: {scores.mean():.1f}")
+    print(f"  Score range: {scores.min()} - {scores.max()}")
+    print(f"  Average skills per resume: {skill_counts.mean():.1f}")
+    print(f"  Max skills: {skill_counts.max()}")
     print("Done!")
 
 
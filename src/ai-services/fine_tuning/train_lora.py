@@ -1,44 +1,108 @@
 import argparse
-import json
+import hashlib
 import os
+from functools import partial
 from typing import List, Dict, Any, Set
 from collections import Counter
 
+import numpy as np
+import orjson
 import torch
-from torch.utils.data import Dataset, DataLoader
+import torch.nn.functional as F
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
 
 
 class JsonlDataset(Dataset):
     def __init__(self, path: str):
         self.items: List[Dict[str, Any]] = []
-        with open(path, "r", encoding="utf-8") as f:
+        # Each text is split exactly once here; the counter feeds build_vocab
+        self.tokens: List[List[str]] = []
+        self.counter: Counter = Counter()
+        with open(path, "rb") as f:
             for line in f:
                 if not line.strip():
                     continue
-                self.items.append(json.loads(line))
+                item = orjson.loads(line)
+                tokens = (item.pop("text", None) or "").lower().split()
+                self.items.append(item)
+                self.tokens.append(tokens)
+                self.counter.update(tokens)
+        self.token_ids: List[np.ndarray] = []
+        self.skill_ids: List[np.ndarray] = []
+
+    def tokenize(self, vocab: Dict[str, int]) -> None:
+        """Convert tokens to vocab ids once, then drop the token strings."""
+        self.token_ids = [
+            np.fromiter((vocab[t] for t in tokens if t in vocab), dtype=np.int64)
+            for tokens in self.tokens
+        ]
+        self.tokens = []
+
+    def encode_skills(self, skill_vocab: Dict[str, int]) -> None:
+        """Map each item's skills to skill-vocab ids once, for vectorized target building."""
+        self.skill_ids = []
+        for it in self.items:
+            skills = it.get("skills", [])
+            if not isinstance(skills, list):
+                skills = []
+            lowered = (s.lower() for s in skills if isinstance(s, str))
+            self.skill_ids.append(
+                np.fromiter((skill_vocab[s] for s in lowered if s in skill_vocab), dtype=np.int64)
+            )
 
     def __len__(self) -> int:
         return len(self.items)
 
-    def __getitem__(self, idx: int) -> Dict[str, Any]:
-        return self.items[idx]
-
-
-def simple_vectorize(text: str, vocab: Dict[str, int]) -> torch.Tensor:
-    vec = torch.zeros(len(vocab), dtype=torch.float32)
-    for token in text.lower().split():
-        if token in vocab:
-            vec[vocab[token]] += 1.0
-    return vec
+    def __getitem__(self, idx: int):
+        skill_ids = self.skill_ids[idx] if self.skill_ids else None
+        return self.items[idx], self.token_ids[idx], skill_ids
+
+
+def bow_matrix(token_ids: List[np.ndarray], dim: int) -> torch.Tensor:
+    """Bag-of-words counts for a batch of token id arrays as a sparse CSR tensor."""
+    crow = np.zeros(len(token_ids) + 1, dtype=np.int64)
+    cols, vals = [], []
+    for i, ids in enumerate(token_ids):
+        uniq, counts = np.unique(ids, return_counts=True)
+        cols.append(uniq)
+        vals.append(counts)
+        crow[i + 1] = crow[i] + len(uniq)
+    return torch.sparse_csr_tensor(
+        torch.from_numpy(crow),
+        torch.from_numpy(np.concatenate(cols).astype(np.int64)),
+        torch.from_numpy(np.concatenate(vals).astype(np.float32)),
+        size=(len(token_ids), dim),
+    )
+
+
+def sparse_linear(x: torch.Tensor, linear: torch.nn.Linear) -> torch.Tensor:
+    """Apply a Linear layer, as a weighted EmbeddingBag sum when the input is a CSR BOW batch.
+
+    For a BOW row, ``W @ x`` is the sum of W's columns for the row's token ids scaled
+    by their counts, i.e. ``embedding_bag(mode="sum")`` over ``W.t()`` with the CSR
+    values as per-sample weights. The Linear parameters are reused as-is so saved
+    checkpoints keep loading into the dense inference model.
+    """
+    if x.layout == torch.sparse_csr:
+        # Keep the gather-sum in fp32 under autocast, like the weights it reads
+        with torch.autocast(device_type=x.device.type, enabled=False):
+            return F.embedding_bag(
+                x.col_indices(), linear.weight.t(), x.crow_indices()[:-1],
+                mode="sum", per_sample_weights=x.values(),
+            ) + linear.bias
+    return linear(x)
+
+
+def loader_kwargs(num_workers: int, pin_memory: bool = False) -> Dict[str, Any]:
+    """DataLoader options that move collate into persistent worker processes."""
+    kwargs: Dict[str, Any] = {"pin_memory": pin_memory}
+    if num_workers > 0:
+        kwargs.update(num_workers=num_workers, persistent_workers=True, prefetch_factor=4)
+    return kwargs
 
 
 def build_vocab(ds: JsonlDataset, max_tokens: int = 5000) -> Dict[str, int]:
-    from collections import Counter
-    c = Counter()
-    for item in ds.items:
-        for token in (item.get("text") or "").lower().split():
-            c[token] += 1
-    vocab = {tok: i for i, (tok, _) in enumerate(c.most_common(max_tokens))}
+    vocab = {tok: i for i, (tok, _) in enumerate(ds.counter.most_common(max_tokens))}
     return vocab
 
 
@@ -53,13 +117,21 @@ class TinyClassifier(torch.nn.Module):
         self.linear = torch.nn.Linear(input_dim, num_labels)
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
-        return self.linear(x)
+        return sparse_linear(x, self.linear)
+
+
+def classifier_collate(batch, vocab_size: int, label_map: Dict[str, int]):
+    items, ids, _ = zip(*batch)
+    ys = [label_map.get(it.get("label") or "general", 0) for it in items]
+    return bow_matrix(ids, vocab_size), torch.tensor(ys, dtype=torch.long)
 
 
-def train_classifier(train_path: str, val_path: str, output_dir: str) -> None:
+def train_classifier(train_path: str, val_path: str, output_dir: str, num_workers: int = 0) -> None:
     train_ds = JsonlDataset(train_path)
     val_ds = JsonlDataset(val_path)
     vocab = build_vocab(train_ds)
+    train_ds.tokenize(vocab)
+    val_ds.tokenize(vocab)
     label_map = labels_to_index(train_ds)
     num_labels = len(label_map)
 
@@ -67,13 +139,10 @@ def train_classifier(train_path: str, val_path: str, output_dir: str) -> None:
     opt = torch.optim.AdamW(model.parameters(), lr=3e-4)
     loss_fn = torch.nn.CrossEntropyLoss()
 
-    def collate(batch):
-        xs = [simple_vectorize(it.get("text") or "", vocab) for it in batch]
-        ys = [label_map.get(it.get("label") or "general", 0) for it in batch]
-        return torch.stack(xs), torch.tensor(ys, dtype=torch.long)
-
-    train_loader = DataLoader(train_ds, batch_size=32, shuffle=True, collate_fn=collate)
-    val_loader = DataLoader(val_ds, batch_size=64, shuffle=False, collate_fn=collate)
+    collate = partial(classifier_collate, vocab_size=len(vocab), label_map=label_map)
+    loader_opts = loader_kwargs(num_workers)
+    train_loader = DataLoader(train_ds, batch_size=32, shuffle=True, collate_fn=collate, **loader_opts)
+    val_loader = DataLoader(val_ds, batch_size=64, shuffle=False, collate_fn=collate, **loader_opts)
 
     for epoch in range(5):
         model.train()
@@ -143,55 +212,185 @@ class TinyResumeParser(torch.nn.Module):
         self.score_head = torch.nn.Linear(128, 1)  # Regression
     
     def forward(self, x: torch.Tensor) -> tuple:
-        encoded = self.encoder(x)
+        # Only the vocab-sized first layer sees the sparse input; the rest stays dense
+        return self.dense_forward(sparse_linear(x, self.encoder[0]))
+
+    def dense_forward(self, h: torch.Tensor) -> tuple:
+        """Everything after the first layer; this is the part handed to torch.compile."""
+        encoded = self.encoder[1:](h)
         skills_logits = self.skills_head(encoded)
         score = self.score_head(encoded)
         return skills_logits, score.squeeze(-1)
 
 
-def train_resume_parser(train_path: str, val_path: str, output_dir: str) -> None:
+def resume_parser_collate(batch, vocab_size: int, num_skills: int):
+    items, ids, skill_ids = zip(*batch)
+    x = bow_matrix(ids, vocab_size)
+
+    # Skills: multi-label binary targets, set with one fancy-index write
+    rows = np.repeat(np.arange(len(skill_ids)), [len(s) for s in skill_ids])
+    skills_targets = torch.zeros(len(skill_ids), num_skills)
+    skills_targets[torch.from_numpy(rows), torch.from_numpy(np.concatenate(skill_ids))] = 1.0
+
+    # Score: regression target
+    scores = [float(it.get("score", 0)) for it in items]
+
+    return (x, 
+            skills_targets, 
+            torch.tensor(scores, dtype=torch.float32))
+
+
+def atomic_save(obj: Any, path: str) -> None:
+    """torch.save to a temp file and rename it into place, so readers never see a partial file."""
+    tmp_path = path + ".tmp"
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def vocab_hash(vocab: Dict[str, int], skill_vocab: Dict[str, int]) -> str:
+    """Digest of both vocabularies; meta.pt and model.pt carry it so a loader can pair them."""
+    payload = orjson.dumps([vocab, skill_vocab], option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+class FeatureTensors(Dataset):
+    """Epoch-invariant resume parser features, built once and indexed by whole batches.
+
+    BOW rows are kept as CSR arrays (crow/col/val) so a batch is sliced out with a
+    few tensor ops; skill and score targets are dense. Use with ``batch_size=None``
+    and a ``BatchSampler`` so ``__getitem__`` receives a list of row indices.
+    """
+
+    def __init__(self, crow: torch.Tensor, col: torch.Tensor, val: torch.Tensor,
+                 skills: torch.Tensor, scores: torch.Tensor, dim: int):
+        self.crow, self.col, self.val = crow, col, val
+        self.skills, self.scores = skills, scores
+        self.dim = dim
+
+    @classmethod
+    def from_dataset(cls, ds: JsonlDataset, vocab_size: int, num_skills: int) -> "FeatureTensors":
+        x, skills, scores = resume_parser_collate([ds[i] for i in range(len(ds))], vocab_size, num_skills)
+        return cls(x.crow_indices(), x.col_indices(), x.values(), skills, scores, vocab_size)
+
+    def state(self) -> Dict[str, Any]:
+        return {"crow": self.crow, "col": self.col, "val": self.val,
+                "skills": self.skills, "scores": self.scores, "dim": self.dim}
+
+    def __len__(self) -> int:
+        return self.skills.size(0)
+
+    def __getitem__(self, idx: List[int]):
+        rows = torch.as_tensor(idx, dtype=torch.long)
+        starts = self.crow[rows]
+        lens = self.crow[rows + 1] - starts
+        crow = torch.cat([lens.new_zeros(1), lens.cumsum(0)])
+        # Positions of every nonzero of the selected rows in the full col/val arrays
+        take = torch.repeat_interleave(starts - crow[:-1], lens) + torch.arange(int(crow[-1]))
+        x = torch.sparse_csr_tensor(crow, self.col[take], self.val[take], size=(len(rows), self.dim))
+        return x, self.skills[rows], self.scores[rows]
+
+
+def load_features(ds: JsonlDataset, data_path: str, train_path: str, vocab_size: int,
+                  num_skills: int, cache_dir: str) -> FeatureTensors:
+    """Build features for ``ds`` or load them from an on-disk cache.
+
+    The cache key covers both files (vocabularies come from the train set) and the
+    vocabulary sizes, so editing either file invalidates it.
+    """
+    key_parts = [vocab_size, num_skills]
+    for path in (train_path, data_path):
+        st = os.stat(path)
+        key_parts += [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+    key = hashlib.sha1(repr(key_parts).encode("utf-8")).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"features_{key}.pt")
+    if os.path.exists(cache_path):
+        return FeatureTensors(**torch.load(cache_path))
+    features = FeatureTensors.from_dataset(ds, vocab_size, num_skills)
+    os.makedirs(cache_dir, exist_ok=True)
+    torch.save(features.state(), cache_path)
+    return features
+
+
+def cpu_has_bf16() -> bool:
+    """Whether the CPU has native bf16 math (AVX512-BF16 or AMX); Linux only, else False."""
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = next((line for line in f if line.startswith("flags")), "").split()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def use_bf16(device: torch.device, mode: str) -> bool:
+    """Resolve --bf16: "auto" enables it only where the hardware runs bf16 faster than fp32."""
+    if mode != "auto":
+        return mode == "on"
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    # Without native bf16 the CPU emulates it, which is slower than plain fp32
+    return cpu_has_bf16()
+
+
+def train_resume_parser(train_path: str, val_path: str, output_dir: str,
+                        compile_model: bool = False, bf16: str = "auto") -> None:
     """Train multi-task resume parser model."""
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    # bf16 autocast needs no GradScaler
+    use_amp = use_bf16(device, bf16)
+    print(f"bf16 autocast: {'on' if use_amp else 'off'} ({device.type})")
     print("Loading datasets...")
     train_ds = JsonlDataset(train_path)
     val_ds = JsonlDataset(val_path)
     
     print("Building vocabularies...")
     vocab = build_vocab(train_ds, max_tokens=5000)
+    train_ds.tokenize(vocab)
+    val_ds.tokenize(vocab)
     skill_vocab = build_skill_vocab(train_ds, min_count=2)
     num_skills = len(skill_vocab)
+    train_ds.encode_skills(skill_vocab)
+    val_ds.encode_skills(skill_vocab)
     
     print(f"Vocabulary size: {len(vocab)}")
     print(f"Skill vocabulary size: {num_skills}")
     
-    model = TinyResumeParser(len(vocab), num_skills)
+    model = TinyResumeParser(len(vocab), num_skills).to(device)
+    if compile_model:
+        # Compile only the dense layers (sparse inputs are not supported by the compiler);
+        # assigning on the instance keeps state_dict keys unchanged for checkpoints.
+        model.dense_forward = torch.compile(model.dense_forward, mode="reduce-overhead")
     opt = torch.optim.AdamW(model.parameters(), lr=3e-4)
     skills_loss_fn = torch.nn.BCEWithLogitsLoss()
     score_loss_fn = torch.nn.MSELoss()
     
-    def collate(batch):
-        xs = [simple_vectorize(it.get("text") or "", vocab) for it in batch]
-        
-        # Skills: multi-label binary targets
-        skills_targets = []
-        for it in batch:
-            skills = it.get("skills", [])
-            target = torch.zeros(num_skills)
-            if isinstance(skills, list):
-                for skill in skills:
-                    skill_lower = skill.lower() if isinstance(skill, str) else ""
-                    if skill_lower in skill_vocab:
-                        target[skill_vocab[skill_lower]] = 1.0
-            skills_targets.append(target)
-        
-        # Score: regression target
-        scores = [float(it.get("score", 0)) for it in batch]
-        
-        return (torch.stack(xs), 
-                torch.stack(skills_targets), 
-                torch.tensor(scores, dtype=torch.float32))
+    # Features are computed once (or loaded from cache) and batches are sliced
+    # from them, so nothing is re-vectorized per epoch.
+    cache_dir = os.path.join(output_dir, "feature_cache")
+    train_feats = load_features(train_ds, train_path, train_path, len(vocab), num_skills, cache_dir)
+    val_feats = load_features(val_ds, val_path, train_path, len(vocab), num_skills, cache_dir)
+    del train_ds, val_ds
     
-    train_loader = DataLoader(train_ds, batch_size=32, shuffle=True, collate_fn=collate)
-    val_loader = DataLoader(val_ds, batch_size=64, shuffle=False, collate_fn=collate)
+    pin = device.type == "cuda"
+    train_loader = DataLoader(train_feats, sampler=BatchSampler(RandomSampler(train_feats), 32, drop_last=False),
+                              batch_size=None, pin_memory=pin)
+    val_loader = DataLoader(val_feats, sampler=BatchSampler(SequentialSampler(val_feats), 64, drop_last=False),
+                            batch_size=None, pin_memory=pin)
+    
+    def autocast():
+        return torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=use_amp)
+    
+    # Vocabularies don't change during training: write them once to meta.pt and
+    # keep the per-epoch model.pt down to the weights. Both carry vocab_hash, since
+    # the previous run's model.pt stays in place until this run's first checkpoint
+    os.makedirs(output_dir, exist_ok=True)
+    run_vocab_hash = vocab_hash(vocab, skill_vocab)
+    atomic_save({
+        "vocab": vocab,
+        "skill_vocab": skill_vocab,
+        "num_skills": num_skills,
+        "input_dim": len(vocab),
+        "vocab_hash": run_vocab_hash,
+    }, os.path.join(output_dir, "meta.pt"))
     
     print("Starting training...")
     best_val_loss = float('inf')
@@ -203,13 +402,17 @@ def train_resume_parser(train_path: str, val_path: str, output_dir: str) -> None
         total_loss = 0.0
         
         for x, skills_target, score_target in train_loader:
+            x = x.to(device, non_blocking=True)
+            skills_target = skills_target.to(device, non_blocking=True)
+            score_target = score_target.to(device, non_blocking=True)
             opt.zero_grad()
-            skills_logits, score_pred = model(x)
-            
-            # Multi-task loss: weighted combination
-            skills_loss = skills_loss_fn(skills_logits, skills_target)
-            score_loss = score_loss_fn(score_pred, score_target)
-            loss = 0.7 * skills_loss + 0.3 * score_loss
+            with autocast():
+                skills_logits, score_pred = model(x)
+                
+                # Multi-task loss: weighted combination
+                skills_loss = skills_loss_fn(skills_logits, skills_target)
+                score_loss = score_loss_fn(score_pred, score_target)
+                loss = 0.7 * skills_loss + 0.3 * score_loss
             
             loss.backward()
             opt.step()
@@ -228,18 +431,22 @@ def train_resume_parser(train_path: str, val_path: str, output_dir: str) -> None
         
         with torch.no_grad():
             for x, skills_target, score_target in val_loader:
-                skills_logits, score_pred = model(x)
-                
-                skills_loss = skills_loss_fn(skills_logits, skills_target)
-                score_loss = score_loss_fn(score_pred, score_target)
-                loss = 0.7 * skills_loss + 0.3 * score_loss
+                x = x.to(device, non_blocking=True)
+                skills_target = skills_target.to(device, non_blocking=True)
+                score_target = score_target.to(device, non_blocking=True)
+                with autocast():
+                    skills_logits, score_pred = model(x)
+                    
+                    skills_loss = skills_loss_fn(skills_logits, skills_target)
+                    score_loss = score_loss_fn(score_pred, score_target)
+                    loss = 0.7 * skills_loss + 0.3 * score_loss
                 
                 val_skills_loss += skills_loss.item()
                 val_score_loss += score_loss.item()
                 val_total += loss.item()
                 
                 # Calculate MAE for score
-                score_mae += torch.abs(score_pred - score_target).sum().item()
+                score_mae += torch.abs(score_pred.float() - score_target).sum().item()
                 score_count += score_target.size(0)
         
         avg_train_loss = total_loss / len(train_loader)
@@ -257,16 +464,12 @@ def train_resume_parser(train_path: str, val_path: str, output_dir: str) -> None
         # Save best model
         if avg_val_loss < best_val_loss:
             best_val_loss = avg_val_loss
-            os.makedirs(output_dir, exist_ok=True)
-            torch.save({
+            atomic_save({
                 "state_dict": model.state_dict(),
-                "vocab": vocab,
-                "skill_vocab": skill_vocab,
-                "num_skills": num_skills,
-                "input_dim": len(vocab),
                 "epoch": epoch + 1,
                 "val_loss": avg_val_loss,
-                "score_mae": avg_score_mae
+                "score_mae": avg_score_mae,
+                "vocab_hash": run_vocab_hash,
             }, os.path.join(output_dir, "model.pt"))
             print(f"  Saved best model (val_loss={avg_val_loss:.4f})")
     
@@ -280,12 +483,18 @@ def main():
     parser.add_argument("--output_dir", required=True)
     parser.add_argument("--task", choices=["classification", "resume_parsing"], 
                        default="classification")
+    parser.add_argument("--compile", action="store_true",
+                        help="torch.compile the resume parser's dense layers (needs a working compiler toolchain)")
+    parser.add_argument("--bf16", choices=["auto", "on", "off"], default="auto",
+                        help="bf16 autocast for the resume parser (auto: bf16-capable GPUs and CPUs only)")
+    parser.add_argument("--num_workers", type=int, default=max(2, (os.cpu_count() or 1) // 2),
+                        help="DataLoader worker processes for batch collation (0 = main process)")
     args = parser.parse_args()
 
     if args.task == "classification":
-        train_classifier(args.train, args.val, args.output_dir)
+        train_classifier(args.train, args.val, args.output_dir, num_workers=args.num_workers)
     elif args.task == "resume_parsing":
-        train_resume_parser(args.train, args.val, args.output_dir)
+        train_resume_parser(args.train, args.val, args.output_dir, compile_model=args.compile, bf16=args.bf16)
 
 
 if __name__ == "__main__":
@@ -1,10 +1,40 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import google.generativeai as genai
 import os
-import json
+import asyncio
+import datetime
 import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+from service_logging import setup_logging
+
+try:
+    import redis.asyncio as redis_asyncio  # optional shared cache
+except ImportError:
+    redis_asyncio = None  # type: ignore
+
+try:
+    import json5  # optional, tolerant parsing of slightly malformed model JSON
+except ImportError:
+    json5 = None  # type: ignore
+
+try:
+    import tiktoken  # optional, token-accurate resume trimming
+except ImportError:
+    tiktoken = None  # type: ignore
 
 # Load .env if present
 try:
@@ -13,13 +43,73 @@ try:
 except Exception:
     pass
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Configure genai with either GOOGLE_API_KEY or GEMINI_API_KEY
 api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 if api_key:
     genai.configure(api_key=api_key)
 
-app = FastAPI()
+# Static part of every /generate prompt; requests only send the variable tail
+GENERATION_INSTRUCTIONS = """You are an expert interview coach creating personalized interview questions.
+Each request gives a position, difficulty, question count and optional truncated resume context.
+Unless told otherwise, answer with an array of JSON objects: [{"question":"string","type":"technical|behavioral|general","expectedDuration":"string"}]"""
+# Minutes to keep the instructions in a Gemini context cache; 0 sends them as a
+# plain system instruction. The API rejects caches below the model's minimum
+# token count, in which case the plain system instruction is used.
+GEMINI_CONTEXT_CACHE_TTL = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "0"))
+
+# Shared Gemini model, created once per worker in the lifespan handler. The SDK
+# keeps one cached client per process, so requests reuse its pooled connection.
+_model: Optional[genai.GenerativeModel] = None
+_cached_content = None
+# Optional Redis client shared by all workers for exact-key cache hits
+_redis = None
+
+REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_KEY_PREFIX = "generate:"
+
+
+def _create_model() -> genai.GenerativeModel:
+    global _cached_content
+    if GEMINI_CONTEXT_CACHE_TTL > 0:
+        try:
+            _cached_content = genai.caching.CachedContent.create(
+                model=model_name,
+                system_instruction=GENERATION_INSTRUCTIONS,
+                ttl=datetime.timedelta(minutes=GEMINI_CONTEXT_CACHE_TTL),
+            )
+            return genai.GenerativeModel.from_cached_content(_cached_content)
+        except Exception as e:
+            logger.warning("Gemini context cache unavailable, using system instruction: %s", e)
+    return genai.GenerativeModel(model_name, system_instruction=GENERATION_INSTRUCTIONS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _model, _redis, _cached_content
+    _model = await asyncio.to_thread(_create_model) if api_key else None
+    if REDIS_URL and redis_asyncio is not None:
+        pool = redis_asyncio.ConnectionPool.from_url(REDIS_URL, max_connections=50)
+        _redis = redis_asyncio.Redis(connection_pool=pool)
+    _batcher.start()
+    yield
+    await _batcher.stop()
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    if _cached_content is not None:
+        try:
+            await asyncio.to_thread(_cached_content.delete)
+        except Exception as e:
+            logger.warning("Gemini context cache cleanup failed: %s", e)
+        _cached_content = None
+    _model = None
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,7 +119,305 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-_cache: dict[str, list[dict]] = {}
+GENERATE_CACHE_SIZE = int(os.getenv("GENERATE_CACHE_SIZE", "10000"))
+GENERATE_CACHE_TTL = int(os.getenv("GENERATE_CACHE_TTL", "3600"))
+
+# cache key -> (expiry on the monotonic clock, questions); least recently used first
+_cache: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+
+
+def _cache_get(key: str) -> Optional[list]:
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry[1]
+
+
+def _cache_put(key: str, questions: list) -> None:
+    _cache[key] = (time.monotonic() + GENERATE_CACHE_TTL, questions)
+    _cache.move_to_end(key)
+    while len(_cache) > GENERATE_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+async def _shared_cache_get(key: str) -> Optional[list]:
+    if _redis is None:
+        return None
+    try:
+        body = await _redis.get(REDIS_KEY_PREFIX + key)
+    except Exception as e:
+        logger.warning("Redis cache lookup failed: %s", e)
+        return None
+    return orjson.loads(body) if body else None
+
+
+async def _shared_cache_set(key: str, questions: list) -> None:
+    if _redis is None:
+        return
+    try:
+        await _redis.setex(REDIS_KEY_PREFIX + key, GENERATE_CACHE_TTL, orjson.dumps(questions))
+    except Exception as e:
+        logger.warning("Redis cache store failed: %s", e)
+
+# First '[' through last ']' of the model output, matched on the UTF-8 bytes
+# orjson parses directly
+_JSON_ARRAY_RE = re.compile(rb'\[.*\]', re.S)
+# Trailing commas are the most common way Gemini's JSON fails to parse
+_TRAILING_COMMA_RE = re.compile(rb',\s*([\]}])')
+
+
+def _loads_lenient(body: bytes) -> Any:
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        if json5 is not None:
+            return json5.loads(body.decode("utf-8"))
+        return orjson.loads(_TRAILING_COMMA_RE.sub(rb'\1', body))
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+# Cosine similarity above which a resume counts as "the same" for a cached question set
+GENERATE_SEMANTIC_THRESHOLD = float(os.getenv("GENERATE_SEMANTIC_THRESHOLD", "0.92"))
+# SQLite file backing the semantic cache across restarts (shared by every worker that
+# points at it); unset keeps it in memory only. Keep it outside the package directory
+GENERATE_CACHE_DB = os.getenv("GENERATE_CACHE_DB", "")
+
+
+class SemanticCache:
+    """Question sets keyed by resume embedding, scoped to (job title, difficulty, count, user).
+
+    Lookups are a numpy dot product against the unit vectors stored for the same
+    context. Entries share the exact cache's size and TTL limits (LRU eviction) and
+    are optionally mirrored to SQLite so a restart doesn't start cold. SQLite
+    writes run in a worker thread so a busy database never stalls the event loop.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl: int, db_path: str = "") -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # cache key -> context key, least recently used first
+        self._order: "OrderedDict[str, str]" = OrderedDict()
+        # context key -> {cache key: (expiry on the wall clock, unit vector, response)}
+        self._entries: Dict[str, Dict[str, Tuple[float, np.ndarray, list]]] = {}
+        self._lock = threading.Lock()
+        # Serializes writes on the shared connection; never taken on the event loop
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                with self._db:
+                    self._db.execute(
+                        "CREATE TABLE IF NOT EXISTS semantic_cache "
+                        "(key TEXT PRIMARY KEY, context TEXT, vector BLOB, response TEXT, expires REAL)"
+                    )
+                    self._db.execute("DELETE FROM semantic_cache WHERE expires <= ?", (time.time(),))
+                rows = self._db.execute(
+                    "SELECT key, context, vector, response, expires FROM semantic_cache "
+                    "ORDER BY expires DESC LIMIT ?", (max_entries,)
+                ).fetchall()
+                # Oldest first, so the freshest rows end up most recently used
+                for key, context, vector, response, expires in reversed(rows):
+                    self._add(key, context, np.frombuffer(vector, dtype=np.float32),
+                              orjson.loads(response), expires)
+            except Exception as e:
+                logger.warning("Semantic cache persistence disabled: %s", e)
+                self._db = None
+
+    def _add(self, key: str, context: str, vector: np.ndarray, response: list, expires: float) -> List[str]:
+        """Insert or replace one entry; returns the keys evicted to stay within max_entries."""
+        previous = self._order.pop(key, None)
+        if previous is not None:
+            self._entries[previous].pop(key, None)
+        self._order[key] = context
+        self._entries.setdefault(context, {})[key] = (expires, vector, response)
+        evicted = []
+        while len(self._order) > self.max_entries:
+            old_key, old_context = self._order.popitem(last=False)
+            self._drop(old_key, old_context)
+            evicted.append(old_key)
+        return evicted
+
+    def _drop(self, key: str, context: str) -> None:
+        bucket = self._entries.get(context)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._entries[context]
+
+    def has_context(self, context: str) -> bool:
+        return context in self._entries
+
+    def find_similar(self, context: str, vector: np.ndarray) -> Optional[list]:
+        with self._lock:
+            bucket = self._entries.get(context)
+            if not bucket:
+                return None
+            now = time.time()
+            for key in [k for k, (expires, _, _) in bucket.items() if expires <= now]:
+                del self._order[key]
+                self._drop(key, context)
+            if not bucket:
+                return None
+            keys = list(bucket)
+            scores = np.stack([bucket[k][1] for k in keys]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self._order.move_to_end(keys[best])
+            return bucket[keys[best]][2]
+
+    async def put(self, key: str, context: str, vector: np.ndarray, response: list) -> None:
+        expires = time.time() + self.ttl
+        with self._lock:
+            evicted = self._add(key, context, vector, response, expires)
+        if self._db is not None:
+            await asyncio.to_thread(self._persist, key, context, vector, response, expires, evicted)
+
+    def _persist(self, key: str, context: str, vector: np.ndarray, response: list,
+                 expires: float, evicted: List[str]) -> None:
+        try:
+            with self._db_lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO semantic_cache VALUES (?, ?, ?, ?, ?)",
+                    (key, context, vector.astype(np.float32).tobytes(), orjson.dumps(response), expires),
+                )
+                self._db.executemany("DELETE FROM semantic_cache WHERE key = ?", [(k,) for k in evicted])
+        except Exception as e:
+            logger.warning("Semantic cache write failed: %s", e)
+
+
+GENERATE_BATCH_SIZE = int(os.getenv("GENERATE_BATCH_SIZE", "8"))
+GENERATE_BATCH_WAIT_MS = int(os.getenv("GENERATE_BATCH_WAIT_MS", "20"))
+
+
+class GenerateBatcher:
+    """Coalesces concurrent /generate prompts into one Gemini call.
+
+    Callers submit their prompt and await a future; a background task collects
+    up to ``max_batch`` prompts (waiting at most ``max_wait_ms`` after the first)
+    and asks for one JSON array of answers. If the combined answer can't be
+    split back per prompt, each prompt is retried on its own.
+
+    Only prompts without resume context are batched. A combined prompt would
+    put one user's resume in front of the model while it answers for another,
+    so personalized prompts are always sent on their own.
+    """
+
+    def __init__(self, max_batch: int, max_wait_ms: int) -> None:
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, prompt: str, shareable: bool = True) -> list:
+        """Parsed question objects for ``prompt``; raises if generation fails.
+
+        ``shareable`` is False for prompts carrying a resume, which skip the batch.
+        """
+        if self._queue is None or not shareable:
+            return await _generate_one(prompt)
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Dispatch without blocking collection of the next batch
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        results: List[Any] = []
+        if len(batch) > 1:
+            try:
+                results = await _generate_many([prompt for prompt, _ in batch])
+            except Exception as e:
+                logger.warning("Batched generation failed, retrying individually: %s", e)
+        if not results:
+            results = await asyncio.gather(
+                *(_generate_one(prompt) for prompt, _ in batch), return_exceptions=True
+            )
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # caller went away
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+async def _generate_one(prompt: str) -> list:
+    response = await _model.generate_content_async(prompt)
+    match = _JSON_ARRAY_RE.search(response.text.encode("utf-8"))
+    if not match:
+        raise Exception("AI response format invalid")
+    return _loads_lenient(match.group())
+
+
+async def _generate_many(prompts: List[str]) -> List[list]:
+    numbered = "\n".join(f"--- Request {i + 1} ---\n{p.strip()}" for i, p in enumerate(prompts))
+    batch_prompt = (
+        f"Answer the {len(prompts)} independent requests below.\n"
+        "Return ONLY a JSON array of arrays: element i is the JSON array answering request i, "
+        "in the same order, with nothing else around it.\n" + numbered
+    )
+    results = await _generate_one(batch_prompt)
+    if len(results) != len(prompts) or not all(isinstance(r, list) for r in results):
+        raise Exception("batched response did not match the requests")
+    return results
+
+
+_batcher = GenerateBatcher(GENERATE_BATCH_SIZE, GENERATE_BATCH_WAIT_MS)
+
+_semantic_cache = SemanticCache(GENERATE_SEMANTIC_THRESHOLD, GENERATE_CACHE_SIZE,
+                                GENERATE_CACHE_TTL, GENERATE_CACHE_DB)
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+async def _embed_snippet(text: str) -> Optional[np.ndarray]:
+    """Unit-normalized embedding of the resume snippet, or None if unavailable."""
+    if not api_key:
+        return None
+    try:
+        result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=text)
+    except Exception as e:
+        logger.warning("Resume embedding skipped: %s", e)
+        return None
+    vector = np.asarray(result["embedding"], dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
 
 @app.get("/health")
 async def health():
@@ -39,84 +427,239 @@ async def health():
 async def test():
     return {"message": "Interview generator service is working!"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    total = _cache_stats["hits"] + _cache_stats["misses"]
+    return {
+        **_cache_stats,
+        "hitRate": round(_cache_stats["hits"] / total, 4) if total else 0.0,
+        "entries": len(_cache),
+    }
+
+def _build_generation_prompt(job_title: str, difficulty: str, num_questions: int, resume_snippet: str) -> str:
+    return (
+        f"Position: {job_title}\n"
+        f"Difficulty: {difficulty}\n"
+        f"Count: {num_questions}\n"
+        f"Resume context (optional, truncated): {resume_snippet}"
+    )
+
+
+def _format_question(index: int, q: dict) -> dict:
+    return {
+        "id": index + 1,
+        "question": q.get("question", f"Question {index+1}"),
+        "type": q.get("type", "general"),
+        "expectedDuration": q.get("expectedDuration", "2-3 minutes"),
+    }
+
+
+def _padding_question(index: int, job_title: str) -> dict:
+    return {
+        "id": index + 1,
+        "question": f"Tell me about a challenge you solved related to {job_title}.",
+        "type": "general",
+        "expectedDuration": "2-3 minutes",
+    }
+
+
+_FALLBACK_TEMPLATES = (
+    ("Describe a recent project relevant to a {job_title} role.", "general", "2-3 minutes"),
+    ("How do you keep your {job_title} skills up to date?", "behavioral", "2 minutes"),
+    ("Explain a difficult concept you mastered related to {job_title}.", "technical", "3-4 minutes"),
+    ("Tell me about a time you overcame a challenge.", "behavioral", "3 minutes"),
+    ("What excites you about working as a {job_title}?", "general", "2 minutes"),
+)
+
+
+@lru_cache(maxsize=1024)
+def _fallback_questions(job_title: str, num_questions: int) -> tuple:
+    """Canned questions used when Gemini is unavailable; shared, so callers must not mutate them."""
+    return tuple(
+        {"id": i + 1, "question": template.format(job_title=job_title), "type": qtype, "expectedDuration": duration}
+        for i, (template, qtype, duration) in enumerate(_FALLBACK_TEMPLATES[:num_questions])
+    )
+
+
+# Token budget for the resume context sent with each prompt
+RESUME_CONTEXT_TOKENS = int(os.getenv("RESUME_CONTEXT_TOKENS", "300"))
+# Highest-signal resume sections go first so trimming drops descriptions before skills
+_RESUME_PRIORITY = ("skills", "experience", "education")
+_encoding = None
+if tiktoken is not None:
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("tiktoken unavailable, trimming resume context by length: %s", e)
+
+
+def _resume_snippet(resume_data: Any) -> str:
+    """Serialize the resume with priority sections first, trimmed to RESUME_CONTEXT_TOKENS."""
+    if isinstance(resume_data, dict):
+        ordered = {k: resume_data[k] for k in _RESUME_PRIORITY if k in resume_data}
+        if isinstance(ordered.get("experience"), list):
+            ordered["experience"] = ordered["experience"][:3]
+        for k, v in resume_data.items():
+            ordered.setdefault(k, v)
+        resume_data = ordered
+    body = orjson.dumps(resume_data)
+    if _encoding is not None:
+        text = body.decode("utf-8")
+        tokens = _encoding.encode(text)
+        return _encoding.decode(tokens[:RESUME_CONTEXT_TOKENS]) if len(tokens) > RESUME_CONTEXT_TOKENS else text
+    # ~4 bytes per token; cut on a UTF-8 boundary
+    return body[:RESUME_CONTEXT_TOKENS * 4].decode("utf-8", "ignore")
+
+
+def _request_params(data: dict) -> Tuple[str, Any, str, int, str]:
+    job_title = data.get("jobTitle", "Software Engineer")
+    resume_data = data.get("resume", {})
+    difficulty = data.get("difficulty", "medium")
+    num_questions = int(data.get("numQuestions", 5))
+    resume_snippet = _resume_snippet(resume_data)
+    return job_title, resume_data, difficulty, num_questions, resume_snippet
+
+
+def _semantic_context(data: dict, job_title: str, difficulty: str, num_questions: int) -> Optional[str]:
+    """Semantic-cache scope for a request, or None without a userId to scope it to.
+
+    Question sets are personalized to the resume, so similar resumes only share
+    them within one user's requests.
+    """
+    user_id = data.get("userId")
+    if not user_id:
+        return None
+    return f"{job_title}|{difficulty}|{num_questions}|{user_id}"
+
+
+async def _lookup_cached(cache_key: str, context_key: Optional[str], resume_snippet: str) -> Tuple[Optional[list], Optional[np.ndarray]]:
+    """Return (cached questions or None, resume embedding computed along the way or None)."""
+    cached = _cache_get(cache_key)
+    if cached is None:
+        cached = await _shared_cache_get(cache_key)
+        if cached is not None:
+            _cache_put(cache_key, cached)
+    # Near-identical resumes (reordered fields, whitespace, paraphrases) from the
+    # same user for the same role/difficulty/count reuse an earlier question set.
+    # The embedding is only awaited here when such a set exists; otherwise it is
+    # computed alongside the Gemini call
+    resume_vector = None
+    if cached is None and context_key is not None and _semantic_cache.has_context(context_key):
+        resume_vector = await _embed_snippet(resume_snippet)
+        if resume_vector is not None:
+            cached = _semantic_cache.find_similar(context_key, resume_vector)
+    _cache_stats["hits" if cached is not None else "misses"] += 1
+    return cached, resume_vector
+
+
+async def _pending_embedding(context_key: Optional[str], resume_vector: Optional[np.ndarray],
+                             resume_snippet: str) -> Optional[np.ndarray]:
+    """The resume embedding to store with fresh questions, if the lookup didn't compute it."""
+    if context_key is None or resume_vector is not None:
+        return resume_vector
+    return await _embed_snippet(resume_snippet)
+
+
+async def _store_cached(cache_key: str, context_key: Optional[str], resume_vector: Optional[np.ndarray], questions: list) -> None:
+    _cache_put(cache_key, questions)
+    await _shared_cache_set(cache_key, questions)
+    if context_key is not None and resume_vector is not None:
+        await _semantic_cache.put(cache_key, context_key, resume_vector, questions)
+
+
+class _ArrayItemScanner:
+    """Pull complete top-level objects out of a JSON array as its text streams in."""
+
+    def __init__(self) -> None:
+        self._chars: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._done = False
+
+    def feed(self, text: str) -> List[str]:
+        items = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._started:
+                self._started = ch == "["
+                continue
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._chars = [ch]
+                elif ch == "]":
+                    self._done = True
+                continue
+            self._chars.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append("".join(self._chars))
+        return items
+
+
+def _sse(event: str, payload: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+
+
 @app.post("/generate")
 async def generate_questions(request: Request):
     try:
         data = await request.json()
-        job_title = data.get("jobTitle", "Software Engineer")
-        resume_data = data.get("resume", {})
-        difficulty = data.get("difficulty", "medium")
-        num_questions = int(data.get("numQuestions", 5))
-
-        # Truncate resume context to reduce tokens
-        resume_snippet = json.dumps(resume_data)[:1200]
+        job_title, resume_data, difficulty, num_questions, resume_snippet = _request_params(data)
         cache_key = hashlib.sha1(f"{job_title}|{difficulty}|{num_questions}|{resume_snippet}".encode()).hexdigest()
-        if cache_key in _cache:
-            return JSONResponse({
+        context_key = _semantic_context(data, job_title, difficulty, num_questions)
+        cached, resume_vector = await _lookup_cached(cache_key, context_key, resume_snippet)
+        if cached is not None:
+            return ORJSONResponse({
                 "success": True,
-                "questions": _cache[cache_key],
+                "questions": cached,
                 "jobTitle": job_title,
                 "difficulty": difficulty,
-                "count": len(_cache[cache_key]),
+                "count": len(cached),
                 "metadata": {"source": "cache", "usedResume": bool(resume_data)}
             })
 
-        model = genai.GenerativeModel(model_name) if api_key else None
-        generation_prompt = f"""
-        You are an expert interview coach creating personalized interview questions for a {job_title} position.
-        Difficulty: {difficulty}
-        Return an array of JSON objects: [{{"question":"string","type":"technical|behavioral|general","expectedDuration":"string"}}]
-        Count: {num_questions}
-        Resume context (optional, truncated): {resume_snippet}
-        """
+        model = _model
+        generation_prompt = _build_generation_prompt(job_title, difficulty, num_questions, resume_snippet)
         try:
             if model is not None:
-                response = model.generate_content(generation_prompt)
-                ai_questions = response.text
-                start_idx = ai_questions.find('[')
-                end_idx = ai_questions.rfind(']') + 1
-                if start_idx != -1 and end_idx != -1:
-                    json_content = ai_questions[start_idx:end_idx]
-                    parsed_questions = json.loads(json_content)
-                    formatted = [
-                        {
-                            "id": i + 1,
-                            "question": q.get("question", f"Question {i+1}"),
-                            "type": q.get("type", "general"),
-                            "expectedDuration": q.get("expectedDuration", "2-3 minutes"),
-                        }
-                        for i, q in enumerate(parsed_questions[:num_questions])
-                    ]
-                    while len(formatted) < num_questions:
-                        formatted.append({
-                            "id": len(formatted) + 1,
-                            "question": f"Tell me about a challenge you solved related to {job_title}.",
-                            "type": "general",
-                            "expectedDuration": "2-3 minutes",
-                        })
-                    _cache[cache_key] = formatted
-                    return JSONResponse({
-                        "success": True,
-                        "questions": formatted,
-                        "jobTitle": job_title,
-                        "difficulty": difficulty,
-                        "count": len(formatted),
-                        "metadata": {"source": "ai", "usedResume": bool(resume_data)}
-                    })
-                else:
-                    raise Exception("AI response format invalid")
+                parsed_questions, resume_vector = await asyncio.gather(
+                    _batcher.submit(generation_prompt, shareable=not resume_data),
+                    _pending_embedding(context_key, resume_vector, resume_snippet),
+                )
+                formatted = [_format_question(i, q) for i, q in enumerate(parsed_questions[:num_questions])]
+                while len(formatted) < num_questions:
+                    formatted.append(_padding_question(len(formatted), job_title))
+                await _store_cached(cache_key, context_key, resume_vector, formatted)
+                return ORJSONResponse({
+                    "success": True,
+                    "questions": formatted,
+                    "jobTitle": job_title,
+                    "difficulty": difficulty,
+                    "count": len(formatted),
+                    "metadata": {"source": "ai", "usedResume": bool(resume_data)}
+                })
             else:
                 raise Exception("No API key configured; using fallback")
         except Exception as ai_error:
-            print(f"AI question generation failed: {str(ai_error)}")
-            enhanced_questions = [
-                {"id": 1, "question": f"Describe a recent project relevant to a {job_title} role.", "type": "general", "expectedDuration": "2-3 minutes"},
-                {"id": 2, "question": f"How do you keep your {job_title} skills up to date?", "type": "behavioral", "expectedDuration": "2 minutes"},
-                {"id": 3, "question": f"Explain a difficult concept you mastered related to {job_title}.", "type": "technical", "expectedDuration": "3-4 minutes"},
-                {"id": 4, "question": f"Tell me about a time you overcame a challenge.", "type": "behavioral", "expectedDuration": "3 minutes"},
-                {"id": 5, "question": f"What excites you about working as a {job_title}?", "type": "general", "expectedDuration": "2 minutes"},
-            ][:num_questions]
-            return JSONResponse({
+            logger.error("AI question generation failed: %s", ai_error)
+            enhanced_questions = _fallback_questions(str(job_title), num_questions)
+            return ORJSONResponse({
                 "success": True,
                 "questions": enhanced_questions,
                 "jobTitle": job_title,
@@ -125,5 +668,75 @@ async def generate_questions(request: Request):
                 "metadata": {"source": "fallback", "usedResume": bool(resume_data)}
             })
     except Exception as e:
-        print(f"Error in generate_questions: {str(e)}")
-        return JSONResponse({"success": False, "error": str(e), "questions": []}) 
\ No newline at end of file
+        logger.error("Error in generate_questions: %s", e)
+        return ORJSONResponse({"success": False, "error": str(e), "questions": []})
+
+
+@app.post("/generate/stream")
+async def generate_questions_stream(request: Request):
+    """Server-sent events variant of /generate.
+
+    Emits a ``question`` event as soon as each question object is complete in
+    Gemini's streamed output, then a ``done`` event with the /generate envelope
+    (without the questions).
+    """
+    try:
+        data = await request.json()
+        job_title, resume_data, difficulty, num_questions, resume_snippet = _request_params(data)
+    except Exception as e:
+        logger.error("Error in generate_questions_stream: %s", e)
+        return ORJSONResponse({"success": False, "error": str(e), "questions": []})
+    cache_key = hashlib.sha1(f"{job_title}|{difficulty}|{num_questions}|{resume_snippet}".encode()).hexdigest()
+    context_key = _semantic_context(data, job_title, difficulty, num_questions)
+
+    async def events():
+        cached, resume_vector = await _lookup_cached(cache_key, context_key, resume_snippet)
+        questions: list = []
+        if cached is not None:
+            source = "cache"
+            for q in cached:
+                questions.append(q)
+                yield _sse("question", q)
+        else:
+            try:
+                if _model is None:
+                    raise Exception("No API key configured; using fallback")
+                prompt = _build_generation_prompt(job_title, difficulty, num_questions, resume_snippet)
+                embedding = asyncio.ensure_future(_pending_embedding(context_key, resume_vector, resume_snippet))
+                response = await _model.generate_content_async(prompt, stream=True)
+                scanner = _ArrayItemScanner()
+                async for chunk in response:
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        continue  # chunk without text parts, e.g. the final finish-reason chunk
+                    for raw in scanner.feed(text):
+                        if len(questions) < num_questions:
+                            q = _format_question(len(questions), orjson.loads(raw))
+                            questions.append(q)
+                            yield _sse("question", q)
+                if not questions:
+                    raise Exception("AI response format invalid")
+                source = "ai"
+                while len(questions) < num_questions:
+                    q = _padding_question(len(questions), job_title)
+                    questions.append(q)
+                    yield _sse("question", q)
+                await _store_cached(cache_key, context_key, await embedding, questions)
+            except Exception as ai_error:
+                logger.error("AI question streaming failed: %s", ai_error)
+                # Questions already sent stand; fill the remaining slots from the fallback set
+                source = "ai" if questions else "fallback"
+                for q in _fallback_questions(str(job_title), num_questions)[len(questions):]:
+                    q = {**q, "id": len(questions) + 1}
+                    questions.append(q)
+                    yield _sse("question", q)
+        yield _sse("done", {
+            "success": True,
+            "jobTitle": job_title,
+            "difficulty": difficulty,
+            "count": len(questions),
+            "metadata": {"source": source, "usedResume": bool(resume_data)}
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -1,36 +1,79 @@
 import os
-import json
+import hashlib
+import logging
 from typing import List, Dict, Any, Tuple
-import math
+from collections import Counter
+import numpy as np
+import orjson
 import google.generativeai as genai
 
+try:
+    import faiss  # optional ANN index for large KBs
+except ImportError:
+    faiss = None  # type: ignore
 
-def _l2_norm(vector: List[float]) -> float:
-    return math.sqrt(sum(v * v for v in vector)) or 1.0
+logger = logging.getLogger(__name__)
 
 
 def cosine_similarity(a: List[float], b: List[float]) -> float:
     if not a or not b or len(a) != len(b):
         return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    return dot / (_l2_norm(a) * _l2_norm(b))
+    va = np.asarray(a, dtype=np.float32)
+    vb = np.asarray(b, dtype=np.float32)
+    return float(va @ vb) / float((np.linalg.norm(va) or 1.0) * (np.linalg.norm(vb) or 1.0))
+
+
+EMBEDDING_MODEL = "text-embedding-004"
+INDEX_FILE = "kb_index.npz"
+# Below this many docs the exact numpy scan is already fast; FAISS only pays off above it
+FAISS_MIN_DOCS = int(os.getenv("KB_FAISS_MIN_DOCS", "1024"))
+# Extra FAISS candidates fetched when a role hint may re-rank results
+HINT_OVERFETCH = 20
+# FAISS vector storage: "" keeps exact float32, "fp16" halves memory, "int8" quarters it
+FAISS_QUANTIZATION = os.getenv("KB_FAISS_QUANTIZATION", "").lower()
+# Width of the hash fallback vectors; API embeddings are never this narrow
+HASH_DIM = 64
+
+
+def _hash_embed(text: str) -> List[float]:
+    """Deterministic HASH_DIM character-hash vector used when the embedding API is unavailable."""
+    # UTF-32 gives one code point per character, matching ord(ch) per char
+    codes = np.frombuffer(text[:256].encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    weights = (codes % 97) / 97.0
+    return np.bincount(np.arange(len(codes)) % HASH_DIM, weights=weights, minlength=HASH_DIM).tolist()
 
 
 def embed_text(text: str) -> List[float]:
     api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
     if not api_key:
-        vec = [0.0] * 64
-        for i, ch in enumerate(text[:256]):
-            vec[i % 64] += (ord(ch) % 97) / 97.0
-        return vec
+        return _hash_embed(text)
     try:
-        result = genai.embed_content(model="text-embedding-004", content=text)
+        result = genai.embed_content(model=EMBEDDING_MODEL, content=text)
         return result["embedding"]  # type: ignore
     except Exception:
-        vec = [0.0] * 64
-        for i, ch in enumerate(text[:256]):
-            vec[i % 64] += (ord(ch) % 97) / 97.0
-        return vec
+        return _hash_embed(text)
+
+
+def embed_texts(texts: List[str]) -> Tuple[List[List[float]], bool]:
+    """Embed many texts with one batched API call (the SDK splits it into requests of 100).
+
+    Empty texts, and every text if the batch call fails, get the hash fallback.
+    The flag is True only when every non-empty text was embedded by the API.
+    """
+    vectors = [_hash_embed(t) for t in texts]
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    pending = [i for i, t in enumerate(texts) if t]
+    if not api_key or not pending:
+        return vectors, False
+    try:
+        result = genai.embed_content(model=EMBEDDING_MODEL, content=[texts[i] for i in pending])
+    except Exception as e:
+        logger.warning("KB batch embedding failed, using hash fallback: %s", e)
+        return vectors, False
+    embedded = result["embedding"]  # type: ignore
+    for i, vec in zip(pending, embedded):
+        vectors[i] = vec
+    return vectors, len(embedded) == len(pending)
 
 
 class KnowledgeBase:
@@ -39,41 +82,126 @@ class KnowledgeBase:
         self.embeddings: List[List[float]] = []
         base_dir = docs_dir or os.path.join(os.path.dirname(__file__), "kb_docs")
         self._load_docs(base_dir)
+        self._build_matrix()
+
+    def _build_matrix(self) -> None:
+        """Stack embeddings into one float32 matrix with precomputed row norms.
+
+        Rows whose length differs from the common dimension (e.g. hash fallbacks
+        mixed with API embeddings) are zeroed, so they score 0 like before.
+        """
+        self._titles = [(doc.get("role") or "").lower() for doc in self.docs]
+        dim = Counter(len(v) for v in self.embeddings).most_common(1)[0][0] if self.embeddings else 0
+        self._emb_matrix = np.zeros((len(self.embeddings), dim), dtype=np.float32)
+        for i, vec in enumerate(self.embeddings):
+            if len(vec) == dim:
+                self._emb_matrix[i] = vec
+        self._norms = np.linalg.norm(self._emb_matrix, axis=1) + 1e-9
+        self._index = None
+        if faiss is not None and len(self.docs) >= FAISS_MIN_DOCS and dim:
+            # Inner product on unit rows == cosine similarity
+            unit = np.ascontiguousarray(self._emb_matrix / self._norms[:, None])
+            self._index = self._new_index(dim)
+            if not self._index.is_trained:
+                self._index.train(unit)
+            self._index.add(unit)
+
+    @staticmethod
+    def _new_index(dim: int):
+        """Flat inner-product index, scalar-quantized per KB_FAISS_QUANTIZATION."""
+        qtypes = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+        if FAISS_QUANTIZATION not in qtypes:
+            return faiss.IndexFlatIP(dim)
+        return faiss.IndexScalarQuantizer(dim, qtypes[FAISS_QUANTIZATION], faiss.METRIC_INNER_PRODUCT)
 
     def _load_docs(self, directory: str) -> None:
         if not os.path.isdir(directory):
             return
+        names: List[str] = []
+        texts: List[str] = []
         for name in os.listdir(directory):
             if not name.endswith(".json"):
                 continue
             path = os.path.join(directory, name)
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    doc = json.load(f)
+                with open(path, "rb") as f:
+                    doc = orjson.loads(f.read())
                     text = doc.get("text") or ""
-                    vec = embed_text(text[:4000])
                     self.docs.append(doc)
-                    self.embeddings.append(vec)
+                    names.append(name)
+                    texts.append(text[:4000])
             except Exception as e:
-                print(f"KB load failed for {name}: {e}")
+                logger.warning("KB load failed for %s: %s", name, e)
+        if not self.docs:
+            return
+
+        # Embeddings are cached next to the docs, keyed on the doc files and the
+        # embedding mode, so restarts skip re-embedding unchanged docs.
+        use_api = bool(os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
+        fingerprint = self._fingerprint(directory, names, use_api)
+        index_path = os.path.join(directory, INDEX_FILE)
+        if use_api:
+            try:
+                with np.load(index_path) as cached:
+                    embeddings = cached["embeddings"]
+                    # Hash-width or short caches are stale leftovers; rebuild them
+                    if (str(cached["fingerprint"]) == fingerprint and embeddings.ndim == 2
+                            and embeddings.shape[0] == len(texts) and embeddings.shape[1] != HASH_DIM):
+                        self.embeddings = list(embeddings)
+                        return
+            except Exception:
+                pass
+        self.embeddings, from_api = embed_texts(texts)
+        # Only real API vectors are cached, so a failed startup re-embeds next time
+        if from_api:
+            try:
+                if len({len(v) for v in self.embeddings}) == 1:
+                    np.savez(index_path, fingerprint=fingerprint,
+                             embeddings=np.asarray(self.embeddings, dtype=np.float32))
+            except Exception as e:
+                logger.warning("KB index not cached: %s", e)
+
+    @staticmethod
+    def _fingerprint(directory: str, names: List[str], use_api: bool) -> str:
+        parts = [EMBEDDING_MODEL if use_api else "hash"]
+        for name in names:
+            st = os.stat(os.path.join(directory, name))
+            parts.append(f"{name}:{st.st_size}:{st.st_mtime_ns}")
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
 
     def retrieve(self, query: str, top_k: int = 3, role_hint: str | None = None):
         if not self.docs or not query:
             return []
-        qvec = embed_text(query[:4000])
-        scored: List[Tuple[float, int]] = []
-        for idx, vec in enumerate(self.embeddings):
-            score = cosine_similarity(qvec, vec)
-            if role_hint:
-                title = (self.docs[idx].get("role") or "").lower()
-                if role_hint.lower() in title:
-                    score += 0.05
-            scored.append((score, idx))
-        scored.sort(key=lambda x: x[0], reverse=True)
+        q = np.asarray(embed_text(query[:4000]), dtype=np.float32)
+        if q.shape[0] != self._emb_matrix.shape[1]:
+            candidates = np.arange(len(self.docs))
+            scores = np.zeros(len(self.docs), dtype=np.float32)
+        else:
+            q /= np.linalg.norm(q) + 1e-9
+            if self._index is not None:
+                # The role bonus is applied to the retrieved candidates only, so
+                # over-fetch a little to let hinted docs move into the top_k
+                k_search = min(len(self.docs), top_k + (HINT_OVERFETCH if role_hint else 0))
+                sims, ids = self._index.search(q[None, :], k_search)
+                keep = ids[0] >= 0
+                candidates, scores = ids[0][keep], sims[0][keep]
+            else:
+                candidates = np.arange(len(self.docs))
+                scores = (self._emb_matrix @ q) / self._norms
+        if role_hint:
+            hint = role_hint.lower()
+            scores = scores + np.fromiter((hint in self._titles[i] for i in candidates), dtype=bool,
+                                          count=len(candidates)) * np.float32(0.05)
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        # Highest score first; ties keep document order
+        top = top[np.lexsort((candidates[top], -scores[top]))]
         results = []
-        for score, idx in scored[:top_k]:
-            item = dict(self.docs[idx])
-            item["_similarity"] = round(float(score), 4)
+        for pos in top:
+            item = dict(self.docs[candidates[pos]])
+            item["_similarity"] = round(float(scores[pos]), 4)
             results.append(item)
         return results
 
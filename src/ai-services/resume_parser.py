@@ -1,14 +1,28 @@
 from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import google.generativeai as genai
+from google.generativeai.types import generation_types
+from pydantic import BaseModel
 import os
-from typing import Dict, Any, Optional, Tuple, Callable
-import json
-import PyPDF2
-from docx import Document
-import io
+from typing import Dict, Any, List, Mapping, Optional, Tuple, Callable
+import orjson
+import numpy as np
 import re
+import time
+import hashlib
+import logging
+import tempfile
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from types import MappingProxyType
+
+from document_text import extract_text_from_docx, extract_text_from_pdf
+from service_logging import setup_logging
 
 # Try to import torch for ML model (optional)
 try:
@@ -18,6 +32,11 @@ except ImportError:
     TORCH_AVAILABLE = False
     torch = None  # type: ignore
 
+try:
+    import aiofiles  # optional, non-blocking upload spooling
+except ImportError:
+    aiofiles = None  # type: ignore
+
 try:
     from knowledge_base import KnowledgeBase  # optional RAG
 except Exception:
@@ -30,13 +49,72 @@ try:
 except Exception:
     pass
 
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Configure genai with either GOOGLE_API_KEY or GEMINI_API_KEY
 api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
 model_name = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 if api_key:
     genai.configure(api_key=api_key)
 
-app = FastAPI()
+# Shared Gemini model, created once per worker in the lifespan handler. The SDK
+# keeps one cached client per process, so requests reuse its pooled connection.
+_model: Optional[genai.GenerativeModel] = None
+
+# Processes used for PDF/DOCX extraction, which holds the GIL; 0 runs it in a thread instead
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+_pool: Optional[ProcessPoolExecutor] = None
+# Caps uploads waiting on the pool so queued file contents don't pile up in memory
+_parse_slots: Optional[asyncio.Semaphore] = None
+# Knowledge base loaded once per worker; None when unavailable
+_kb = None
+
+
+def _create_kb():
+    try:
+        return KnowledgeBase()
+    except Exception as e:
+        logger.warning("Knowledge base unavailable: %s", e)
+        return None
+
+
+def _create_pool() -> ProcessPoolExecutor:
+    """Extraction pool whose workers are never forked from this process.
+
+    gRPC, torch and the log listener already run threads here, and forking
+    a threaded process can deadlock the child. Workers come from a forkserver
+    (spawn where that is unavailable) and only need document_text.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["document_text", "service_logging"])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=context, initializer=setup_logging)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _model, _pool, _parse_slots, _kb
+    _model = genai.GenerativeModel(model_name) if api_key else None
+    if KnowledgeBase is not None:
+        # Loading may embed docs over the network; keep it off the event loop
+        _kb = await asyncio.to_thread(_create_kb)
+    await asyncio.to_thread(_preload_role_profiles)
+    await asyncio.to_thread(_load_ml_parser)
+    if PARSE_WORKERS > 0:
+        _pool = _create_pool()
+        _parse_slots = asyncio.Semaphore(PARSE_WORKERS * 2)
+    yield
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    _kb = None
+    _model = None
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -49,70 +127,196 @@ app.add_middleware(
 # Helper functions for text extraction from binary files
 async def extract_text_from_file(file: UploadFile) -> str:
     """Extract text content from uploaded file based on file extension"""
+    source, _ = await read_upload(file)
+    return await extract_text(source, file.filename)
+
+async def read_upload(file: UploadFile) -> Tuple[bytes | str, str]:
+    """Read a bounded upload and return (source, SHA-256 hex digest of its bytes).
+
+    The source is the raw bytes for text files, or for PDF/DOCX the path of a
+    temp file, so the extractor opens it by path instead of holding (and
+    pickling to the pool) the whole document. Pass it to extract_text or
+    _discard_upload so the temp file is removed.
+    """
     try:
-        content = await file.read()
-        
-        if file.filename.lower().endswith('.pdf'):
-            return extract_text_from_pdf(content)
-        elif file.filename.lower().endswith('.docx'):
-            return extract_text_from_docx(content)
-        else:
+        ext = os.path.splitext(file.filename.lower())[1]
+        digest = hashlib.sha256()
+        if ext not in _EXTRACTORS:
             # For .txt files or other text formats
-            return content.decode('utf-8', errors='ignore')
-            
+            content = await file.read(MAX_UPLOAD_BYTES + 1)
+            if len(content) > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge()
+            digest.update(content)
+            return content, digest.hexdigest()
+        path = await _spool_upload(file, ext, digest)
+        return path, digest.hexdigest()
+    except UploadTooLarge:
+        raise
     except Exception as e:
-        print(f"Error reading file: {str(e)}")
+        logger.error("Error reading file: %s", e)
         raise Exception(f"Failed to read file: {str(e)}")
 
-def extract_text_from_pdf(content: bytes) -> str:
-    """Extract text from PDF content"""
+async def extract_text(source: bytes | str, filename: str) -> str:
+    """Extract text from what read_upload returned, removing its temp file."""
+    if isinstance(source, bytes):
+        return source.decode('utf-8', errors='ignore')
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        # PDF/DOCX parsing is CPU-bound; run it off the event loop
+        extract = _EXTRACTORS[os.path.splitext(filename.lower())[1]]
+        return await _run_extractor(extract, source)
     except Exception as e:
-        print(f"Error extracting PDF text: {str(e)}")
-        raise Exception(f"Failed to extract PDF text: {str(e)}")
+        logger.error("Error reading file: %s", e)
+        raise Exception(f"Failed to read file: {str(e)}")
+    finally:
+        _discard_upload(source)
 
-def extract_text_from_docx(content: bytes) -> str:
-    """Extract text from DOCX content"""
-    try:
-        doc = Document(io.BytesIO(content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting DOCX text: {str(e)}")
-        raise Exception(f"Failed to extract DOCX text: {str(e)}")
+def _discard_upload(source: bytes | str) -> None:
+    if isinstance(source, str):
+        os.unlink(source)
+
+UPLOAD_CHUNK_BYTES = 1 << 16
+# Uploads above this are rejected with 413 before any parsing
+MAX_UPLOAD_BYTES = int(os.getenv("RESUME_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    def __init__(self) -> None:
+        super().__init__(f"Resume file exceeds the upload limit of {MAX_UPLOAD_BYTES} bytes.")
 
-def _load_role_profile(job_title: str | None) -> dict:
+
+async def _spool_upload(file: UploadFile, suffix: str, digest: Any) -> str:
+    """Copy an upload to a named temp file in chunks, hashing it into ``digest``, and return its path.
+
+    Stops and removes the temp file as soon as MAX_UPLOAD_BYTES is exceeded, and
+    on any other failure or cancellation.
+    """
+    if aiofiles is not None:
+        async with aiofiles.tempfile.NamedTemporaryFile("wb", suffix=suffix, delete=False) as tmp:
+            try:
+                size = 0
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise UploadTooLarge()
+                    digest.update(chunk)
+                    await tmp.write(chunk)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+        return tmp.name
+
+    def copy() -> str:
+        file.file.seek(0)
+        with tempfile.NamedTemporaryFile("wb", suffix=suffix, delete=False) as tmp:
+            try:
+                size = 0
+                while chunk := file.file.read(UPLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > MAX_UPLOAD_BYTES:
+                        raise UploadTooLarge()
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            except BaseException:
+                os.unlink(tmp.name)
+                raise
+        return tmp.name
+
+    return await asyncio.to_thread(copy)
+
+
+async def _run_extractor(extract: Callable[[Any], str], source: Any) -> str:
+    """Run an extractor in the process pool, or a thread when the pool is disabled."""
+    if _pool is None:
+        return await asyncio.to_thread(extract, source)
+    async with _parse_slots:
+        return await asyncio.get_running_loop().run_in_executor(_pool, extract, source)
+
+# Binary formats parsed in the pool, by lowercase extension; anything else is read as UTF-8 text
+_EXTRACTORS: Mapping[str, Callable[[bytes | str], str]] = MappingProxyType({
+    '.pdf': extract_text_from_pdf,
+    '.docx': extract_text_from_docx,
+})
+
+_EMPTY_PROFILE: Mapping[str, Any] = MappingProxyType({})
+
+
+ROLE_PROFILES_DIR = os.path.join(os.path.dirname(__file__), "role_profiles")
+
+
+def _load_role_profile(job_title: str | None) -> Mapping[str, Any]:
+    """Role profile for a job title; re-read only when its file changes."""
     if not job_title:
-        return {}
+        return _EMPTY_PROFILE
+    key = job_title.lower().replace("/", "-").replace(" ", "_")
+    profile_path = os.path.join(ROLE_PROFILES_DIR, f"{key}.json")
     try:
-        key = job_title.lower().replace("/", "-").replace(" ", "_")
-        profile_path = os.path.join(os.path.dirname(__file__), "role_profiles", f"{key}.json")
-        if os.path.exists(profile_path):
-            with open(profile_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+        mtime_ns = os.stat(profile_path).st_mtime_ns
+    except OSError:
+        return _EMPTY_PROFILE
+    return _read_role_profile(profile_path, mtime_ns)
+
+
+@lru_cache(maxsize=128)
+def _read_role_profile(profile_path: str, mtime_ns: int) -> Mapping[str, Any]:
+    """Parsed profile file; read-only since it is shared."""
+    try:
+        with open(profile_path, "rb") as f:
+            profile = orjson.loads(f.read())
+        # Lowercased must-haves for _apply_role_alignment, computed once per profile
+        profile["_must_have_lower"] = frozenset(s.lower() for s in profile.get("must_have_skills", []))
+        return MappingProxyType(profile)
     except Exception as e:
-        print(f"Failed to load role profile: {e}")
-    return {}
+        logger.warning("Failed to load role profile: %s", e)
+    return _EMPTY_PROFILE
+
+
+def _preload_role_profiles() -> None:
+    """Parse every role profile up front so first requests per role skip the disk."""
+    try:
+        names = [n for n in os.listdir(ROLE_PROFILES_DIR) if n.endswith(".json")]
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(ROLE_PROFILES_DIR, name)
+        try:
+            _read_role_profile(path, os.stat(path).st_mtime_ns)
+        except OSError:
+            pass
+
+
+# "int8" dynamically quantizes the ML parser's Linear layers (4x smaller weights);
+# off by default since it shifts scores near the confidence threshold slightly
+ML_PARSER_QUANTIZATION = os.getenv("ML_PARSER_QUANTIZATION", "").lower()
+# Compile the ML parser with torch.compile at load time (needs a C compiler; adds seconds to startup)
+ML_PARSER_COMPILE = os.getenv("ML_PARSER_COMPILE", "").lower() in ("1", "true", "yes")
 
 
 def _load_ml_parser() -> Tuple[Optional[Callable], Optional[Callable]]:
-    """Load ML resume parser model if available."""
+    """Load ML resume parser model if available; reloaded only when model.pt changes."""
     if not TORCH_AVAILABLE:
         return None, None
-    
+    model_path = os.path.join(os.path.dirname(__file__), "models", "resume_parser_ml", "model.pt")
     try:
-        model_path = os.path.join(os.path.dirname(__file__), "models", "resume_parser_ml", "model.pt")
-        if not os.path.exists(model_path):
-            return None, None
-        
+        mtime_ns = os.stat(model_path).st_mtime_ns
+    except OSError:
+        return None, None
+    return _load_ml_parser_from(model_path, mtime_ns)
+
+
+@lru_cache(maxsize=1)
+def _load_ml_parser_from(model_path: str, mtime_ns: int) -> Tuple[Optional[Callable], Optional[Callable]]:
+    try:
+        # The model is tiny; one intra-op thread avoids oversubscribing the uvicorn host
+        torch.set_num_threads(1)
         checkpoint = torch.load(model_path, map_location='cpu')
+        if "vocab" not in checkpoint:
+            # Newer checkpoints keep vocabularies in a separate meta.pt written once per run
+            meta = torch.load(os.path.join(os.path.dirname(model_path), "meta.pt"), map_location='cpu')
+            if meta.get("vocab_hash") != checkpoint.get("vocab_hash"):
+                # meta.pt is from a newer training run whose first checkpoint hasn't landed yet
+                logger.warning("ML parser meta.pt does not match model.pt; skipping ML parser")
+                return None, None
+            checkpoint = {**meta, **checkpoint}
         vocab = checkpoint.get("vocab", {})
         skill_vocab = checkpoint.get("skill_vocab", {})
         input_dim = checkpoint.get("input_dim", len(vocab))
@@ -141,26 +345,32 @@ def _load_ml_parser() -> Tuple[Optional[Callable], Optional[Callable]]:
         model = TinyResumeParser(input_dim, num_skills)
         model.load_state_dict(checkpoint["state_dict"])
         model.eval()
+        if ML_PARSER_QUANTIZATION == "int8":
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if ML_PARSER_COMPILE:
+            model = _compile_ml_model(model, input_dim)
+        
+        vocab_get = vocab.get
+        # Skill name per output index (skill vocabularies are built in index order)
+        idx_to_skill = [None] * num_skills
+        for skill, idx in skill_vocab.items():
+            idx_to_skill[idx] = skill
         
         def vectorize_text(text: str) -> torch.Tensor:
-            """Vectorize text using vocab."""
-            vec = torch.zeros(len(vocab), dtype=torch.float32)
-            for token in text.lower().split():
-                if token in vocab:
-                    vec[vocab[token]] += 1.0
-            return vec
+            """Vectorize text using vocab (bag-of-words counts)."""
+            idxs = np.fromiter((vocab_get(token, -1) for token in text.lower().split()), dtype=np.int64)
+            counts = np.bincount(idxs[idxs >= 0], minlength=len(vocab))
+            return torch.from_numpy(counts.astype(np.float32))
         
         def parse_fn(text: str) -> Dict[str, Any]:
             """Parse resume text using ML model."""
-            with torch.no_grad():
+            with torch.inference_mode():
                 x = vectorize_text(text).unsqueeze(0)
                 skills_logits, score_pred = model(x)
                 
                 # Get predicted skills (sigmoid > 0.5)
-                skills_probs = torch.sigmoid(skills_logits[0])
-                predicted_skill_indices = (skills_probs > 0.5).nonzero(as_tuple=True)[0]
-                predicted_skills = [skill for skill, idx in skill_vocab.items() 
-                                   if idx in predicted_skill_indices.tolist()]
+                skills_probs = torch.sigmoid(skills_logits[0]).numpy()
+                predicted_skills = [idx_to_skill[idx] for idx in np.flatnonzero(skills_probs > 0.5).tolist()]
                 
                 # Get predicted score
                 predicted_score = float(score_pred[0].item())
@@ -168,7 +378,7 @@ def _load_ml_parser() -> Tuple[Optional[Callable], Optional[Callable]]:
                 
                 # Calculate confidence based on model output
                 # Higher confidence if skills_probs are well-separated (high or low)
-                skills_confidence = float(torch.mean(torch.abs(skills_probs - 0.5) * 2).item())
+                skills_confidence = float(np.abs(skills_probs - 0.5).mean() * 2)
                 score_confidence = 1.0 - min(1.0, abs(predicted_score - 50) / 50)  # Higher if score is extreme
                 overall_confidence = (skills_confidence * 0.6 + score_confidence * 0.4)
                 
@@ -188,37 +398,49 @@ def _load_ml_parser() -> Tuple[Optional[Callable], Optional[Callable]]:
             """Calculate confidence score from ML result."""
             return result.get("confidence", 0.5)
         
-        print("ML resume parser loaded successfully")
+        logger.debug("ML resume parser loaded successfully")
         return parse_fn, confidence_fn
         
     except Exception as e:
-        print(f"Failed to load ML parser: {e}")
+        logger.warning("Failed to load ML parser: %s", e)
         return None, None
 
 
+def _compile_ml_model(model: Any, input_dim: int) -> Any:
+    """torch.compile the parser for its fixed (1, input_dim) input, keeping eager mode on failure."""
+    try:
+        compiled = torch.compile(model, dynamic=False)
+        with torch.inference_mode():
+            compiled(torch.zeros(1, input_dim))  # compile now rather than on the first request
+        return compiled
+    except Exception as e:
+        logger.warning("torch.compile failed, using eager ML parser: %s", e)
+        return model
+
+
+# Job title patterns for the ML path's experience summary
+_TITLE_PATTERNS = (
+    re.compile(r"(?:Senior|Junior|Lead|Principal)?\s*(?:Software|Data|DevOps|ML|AI|Full.?Stack)?\s*(?:Engineer|Developer|Scientist|Architect|Manager)", re.IGNORECASE),
+    re.compile(r"(?:Software|Data|DevOps|ML|AI|Full.?Stack)?\s*(?:Engineer|Developer|Scientist|Architect|Manager)", re.IGNORECASE),
+)
+
+
 def _extract_experience_keywords(text: str) -> list:
     """Extract experience using keyword matching."""
     experience = []
-    # Look for job title patterns
-    title_patterns = [
-        r"(?:Senior|Junior|Lead|Principal)?\s*(?:Software|Data|DevOps|ML|AI|Full.?Stack)?\s*(?:Engineer|Developer|Scientist|Architect|Manager)",
-        r"(?:Software|Data|DevOps|ML|AI|Full.?Stack)?\s*(?:Engineer|Developer|Scientist|Architect|Manager)",
-    ]
-    
-    lines = text.split('\n')
-    for line in lines:
-        for pattern in title_patterns:
-            matches = re.finditer(pattern, line, re.IGNORECASE)
-            for match in matches:
-                exp_text = line.strip()
-                if exp_text and len(exp_text) < 100:  # Reasonable length
-                    experience.append({
-                        "title": match.group(0),
-                        "company": "Unknown",
-                        "duration": "Unknown",
-                        "achievements": []
-                    })
-                    break
+    for line in text.split('\n'):
+        exp_text = line.strip()
+        if not exp_text or len(exp_text) >= 100:  # Reasonable length
+            continue
+        for pattern in _TITLE_PATTERNS:
+            match = pattern.search(line)
+            if match:
+                experience.append({
+                    "title": match.group(0),
+                    "company": "Unknown",
+                    "duration": "Unknown",
+                    "achievements": []
+                })
         if len(experience) >= 3:  # Limit to 3
             break
     
@@ -230,33 +452,31 @@ def _extract_experience_keywords(text: str) -> list:
     }]
 
 
+# Degree keywords matched as whole words in one pass; the highest-ranked hit wins
+_EDUCATION_RE = re.compile(
+    r"\b(?:(?P<phd>ph\.?d|doctorate)|(?P<master>master|m\.?(?:e|sc?)\b)|(?P<bachelor>bachelor|b\.?(?:e|sc?)\b))",
+    re.IGNORECASE,
+)
+_EDUCATION_RANK = {"bachelor": 1, "master": 2, "phd": 3}
+_EDUCATION_DEGREES = {"bachelor": "Bachelor's", "master": "Master's", "phd": "Ph.D"}
+
+
 def _extract_education_keywords(text: str) -> dict:
     """Extract education using keyword matching."""
-    education_keywords = {
-        "phd": "Ph.D",
-        "ph.d": "Ph.D",
-        "doctorate": "Ph.D",
-        "master": "Master's",
-        "m.e": "Master's",
-        "me": "Master's",
-        "m.s": "Master's",
-        "ms": "Master's",
-        "bachelor": "Bachelor's",
-        "b.e": "Bachelor's",
-        "be": "Bachelor's",
-        "b.s": "Bachelor's",
-        "bs": "Bachelor's"
-    }
-    
-    text_lower = text.lower()
-    for keyword, degree in education_keywords.items():
-        if keyword in text_lower:
-            return {
-                "degree": degree,
-                "institution": "Unknown",
-                "year": "Unknown",
-                "gpa": ""
-            }
+    best = None
+    for match in _EDUCATION_RE.finditer(text):
+        group = match.lastgroup
+        if best is None or _EDUCATION_RANK[group] > _EDUCATION_RANK[best]:
+            best = group
+            if group == "phd":
+                break
+    if best is not None:
+        return {
+            "degree": _EDUCATION_DEGREES[best],
+            "institution": "Unknown",
+            "year": "Unknown",
+            "gpa": ""
+        }
     
     return {
         "degree": "Bachelor's",
@@ -290,112 +510,29 @@ def _parse_resume_ml(text: str, parser_fn: Callable, job_title: str | None = Non
     return formatted
 
 
-def _apply_role_alignment(parsed_data: Dict[str, Any], role_profile: Dict[str, Any], job_title: str) -> Dict[str, Any]:
+def _apply_role_alignment(parsed_data: Dict[str, Any], role_profile: Mapping[str, Any], job_title: str) -> Dict[str, Any]:
     """Apply role profile alignment checks to parsed data."""
-    must = set([s.lower() for s in role_profile.get("must_have_skills", [])])
-    has = set([s.lower() for s in parsed_data.get("skills", [])])
+    must = role_profile.get("_must_have_lower")
+    if must is None:
+        must = frozenset(s.lower() for s in role_profile.get("must_have_skills", []))
+    has = {s.lower() for s in parsed_data.get("skills", [])}
     missing = [s for s in role_profile.get("must_have_skills", []) if s.lower() not in has]
     
     parsed_data["roleAlignment"] = {
         "targetRole": role_profile.get("title", job_title),
-        "mustHaveCoverage": round(100 * (len(must.intersection(has)) / max(len(must) or 1, 1))),
+        "mustHaveCoverage": round(100 * (len(must & has) / max(len(must), 1))),
         "missingMustHaves": missing[:10]
     }
     return parsed_data
 
 
-@app.post("/parse")
-async def parse_resume(file: UploadFile = File(...), jobTitle: str | None = Form(default=None)):
-    try:
-        print(f"Processing resume: {file.filename}")
-        print(f"File size: {file.size} bytes")
-        print(f"Content type: {file.content_type}")
-        
-        # Extract text content from the file
-        text_content = await extract_text_from_file(file)
-        
-        if not text_content or len(text_content.strip()) < 50:
-            return JSONResponse({
-                "success": False,
-                "error": "Resume content too short or empty. Please upload a valid resume.",
-                "data": None
-            })
-        
-        print(f"Extracted text length: {len(text_content)} characters")
-        print(f"Text preview: {text_content[:200]}...")
-        
-        # Try ML parser first
-        ml_parser, confidence_fn = _load_ml_parser()
-        if ml_parser:
-            try:
-                print("Attempting ML-based resume parsing...")
-                ml_result = _parse_resume_ml(text_content, ml_parser, jobTitle)
-                confidence = confidence_fn(ml_result)
-                
-                print(f"ML parsing confidence: {confidence:.2f}")
-                
-                if confidence >= 0.7:  # Confidence threshold
-                    # Apply role profile alignment if jobTitle provided
-                    if jobTitle:
-                        role_profile = _load_role_profile(jobTitle)
-                        if role_profile:
-                            ml_result = _apply_role_alignment(ml_result, role_profile, jobTitle)
-                    
-                    print("ML parsing successful, returning ML results")
-                    return JSONResponse({
-                        "success": True,
-                        "data": ml_result,
-                        "message": "Resume parsed successfully using ML model"
-                    })
-                else:
-                    print(f"ML confidence too low ({confidence:.2f} < 0.7), falling back to AI")
-            except Exception as ml_error:
-                print(f"ML parsing failed, falling back to AI: {ml_error}")
-                # Continue to AI fallback
-        
-        # Fallback to AI service (existing code)
-        print("Using AI service for resume parsing...")
-        role_profile = _load_role_profile(jobTitle)
-        # Use Gemini AI for comprehensive resume analysis if configured
-        model = genai.GenerativeModel(model_name) if api_key else None
-        
-        # Create comprehensive resume analysis prompt with truncated content
-        snippet = text_content[:4000]
-        role_context = ""
-        if role_profile:
-            role_context = f"""
-            Target Role Profile:
-            Title: {role_profile.get('title', jobTitle)}
-            Seniority: {role_profile.get('seniority', 'unspecified')}
-            Must-Have Skills: {', '.join(role_profile.get('must_have_skills', [])[:30])}
-            Nice-to-Have Skills: {', '.join(role_profile.get('nice_to_have_skills', [])[:30])}
-            Impact Patterns: {', '.join(role_profile.get('impact_patterns', [])[:10])}
-            Anti-Patterns: {', '.join(role_profile.get('anti_patterns', [])[:10])}
-            """
-
-        # Retrieve senior exemplars from KB to ground suggestions
-        kb_context = ""
-        if KnowledgeBase is not None:
-            try:
-                kb = KnowledgeBase()
-                retrieved = kb.retrieve(query=snippet, top_k=2, role_hint=jobTitle)
-                if retrieved:
-                    parts = []
-                    for r in retrieved:
-                        text = (r.get("text") or "")[:1000]
-                        parts.append(text)
-                    kb_context = "\n\nRetrieved Exemplars (anonymized):\n" + "\n---\n".join(parts)
-            except Exception as e:
-                print(f"KB retrieval skipped: {e}")
-
-        analysis_prompt = f"""
+# Static instructions and JSON schema around the per-request resume, role and KB context
+ANALYSIS_PROMPT_HEAD = """
         You are an expert resume analyst and career coach. Analyze the following resume and provide comprehensive insights.
         
         Resume Content (truncated):
-        {snippet}
-        
-        {role_context}
-        {kb_context}
+        """
+ANALYSIS_PROMPT_TAIL = """
 
         Please provide a detailed analysis with the following structure:
         
@@ -429,141 +566,327 @@ async def parse_resume(file: UploadFile = File(...), jobTitle: str | None = Form
            - Professional objectives
         
         Return the response as a JSON object with this exact structure:
-        {{
+        {
             "skills": ["skill1", "skill2"],
             "experience": [
-                {{
+                {
                     "title": "string",
                     "company": "string",
                     "duration": "string",
                     "achievements": ["string1", "string2"]
-                }}
+                }
             ],
-            "education": {{
+            "education": {
                 "degree": "string",
                 "institution": "string",
                 "year": "string",
                 "gpa": "string"
-            }},
+            },
             "projects": [
-                {{
+                {
                     "name": "string",
                     "description": "string",
                     "technologies": ["tech1", "tech2"],
                     "outcome": "string"
-                }}
+                }
             ],
             "certifications": ["cert1", "cert2"],
             "summary": "string",
-            "contact": {{
+            "contact": {
                 "email": "string",
                 "phone": "string",
                 "location": "string",
                 "linkedin": "string"
-            }}
-        }}
+            }
+        }
         
         Make sure to extract all relevant information and structure it properly. If a target role profile is provided, tailor the analysis to emphasize alignment with that role and explicitly call out gaps vs the must-have skills.
         """
+
+class ExperienceEntry(BaseModel):
+    title: str
+    company: str
+    duration: str
+    achievements: List[str]
+
+
+class Education(BaseModel):
+    degree: str
+    institution: str
+    year: str
+    gpa: str
+
+
+class Project(BaseModel):
+    name: str
+    description: str
+    technologies: List[str]
+    outcome: str
+
+
+class Contact(BaseModel):
+    email: str
+    phone: str
+    location: str
+    linkedin: str
+
+
+class ResumeSchema(BaseModel):
+    """Structured resume analysis, mirroring the JSON shape described in the prompt."""
+    skills: List[str]
+    experience: List[ExperienceEntry]
+    education: Education
+    projects: List[Project]
+    certifications: List[str]
+    summary: str
+    contact: Contact
+
+
+# Gemini returns schema-constrained JSON, so the response text parses as-is.
+# The schema is converted to protos once here instead of on every call.
+_ANALYSIS_CONFIG = generation_types.to_generation_config_dict(genai.GenerationConfig(
+    response_mime_type="application/json", response_schema=ResumeSchema))
+
+
+PARSE_CACHE_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "256"))
+PARSE_CACHE_TTL = int(os.getenv("PARSE_CACHE_TTL", "3600"))
+
+# (SHA-256 of the upload, job title) -> (expiry on the monotonic clock, response body); least recently used first
+_parse_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+
+def _parse_cache_get(key: str) -> Optional[dict]:
+    entry = _parse_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _parse_cache[key]
+        return None
+    _parse_cache.move_to_end(key)
+    return entry[1]
+
+
+def _parse_cache_put(key: str, body: dict) -> dict:
+    _parse_cache[key] = (time.monotonic() + PARSE_CACHE_TTL, body)
+    _parse_cache.move_to_end(key)
+    while len(_parse_cache) > PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
+    return body
+
+
+# Canned analysis returned when Gemini is unavailable. Shared by every fallback
+# response, so it is never mutated; role alignment works on a shallow copy.
+_FALLBACK_DATA: Dict[str, Any] = {
+    "skills": ["JavaScript", "React", "Node.js", "Python", "SQL", "Git", "AWS", "Docker", "TypeScript", "MongoDB"],
+    "experience": [
+        {
+            "title": "Senior Software Engineer",
+            "company": "Tech Solutions Inc.",
+            "duration": "2022 - Present",
+            "achievements": [
+                "Led development of microservices architecture",
+                "Improved system performance by 40%",
+                "Mentored 3 junior developers"
+            ]
+        },
+        {
+            "title": "Full Stack Developer",
+            "company": "Digital Innovations",
+            "duration": "2020 - 2022",
+            "achievements": [
+                "Built responsive web applications",
+                "Implemented CI/CD pipelines",
+                "Reduced bug reports by 30%"
+            ]
+        }
+    ],
+    "education": {
+        "degree": "Bachelor of Science in Computer Science",
+        "institution": "University of Technology",
+        "year": "2020",
+        "gpa": "3.8/4.0"
+    },
+    "projects": [
+        {
+            "name": "E-commerce Platform",
+            "description": "Full-stack e-commerce solution with payment integration",
+            "technologies": ["React", "Node.js", "MongoDB", "Stripe"],
+            "outcome": "Successfully deployed and serving 1000+ users"
+        },
+        {
+            "name": "Task Management App",
+            "description": "Collaborative project management tool",
+            "technologies": ["Vue.js", "Express", "PostgreSQL"],
+            "outcome": "Used by 5 development teams"
+        }
+    ],
+    "certifications": ["AWS Certified Developer", "MongoDB Certified Developer", "Google Cloud Professional"],
+    "summary": "Experienced full-stack developer with 3+ years building scalable web applications. Passionate about clean code, user experience, and continuous learning. Strong expertise in modern JavaScript frameworks, cloud services, and agile development methodologies.",
+    "contact": {"email": "developer@example.com", "phone": "+1-555-0123", "location": "San Francisco, CA", "linkedin": "linkedin.com/in/developer"}
+}
+
+
+async def _retrieve_kb_context(snippet: str, job_title: str | None) -> str:
+    """Prompt section with senior exemplars retrieved from the KB; empty on failure."""
+    try:
+        # Query embedding is a blocking API call
+        retrieved = await asyncio.to_thread(_kb.retrieve, snippet, 2, job_title)
+    except Exception as e:
+        logger.warning("KB retrieval skipped: %s", e)
+        return ""
+    if not retrieved:
+        return ""
+    parts = [(r.get("text") or "")[:1000] for r in retrieved]
+    return "\n\nRetrieved Exemplars (anonymized):\n" + "\n---\n".join(parts)
+
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+MIN_TEXT_CHARS = 50
+# Shorter texts carry too few tokens for a confident ML parse; send them straight to Gemini
+ML_MIN_TEXT_CHARS = 200
+_TOO_SHORT_RESPONSE = {
+    "success": False,
+    "error": "Resume content too short or empty. Please upload a valid resume.",
+    "data": None
+}
+
+
+@app.post("/parse")
+async def parse_resume(file: UploadFile = File(...), jobTitle: str | None = Form(default=None)):
+    try:
+        logger.debug("Processing resume: %s (%s bytes, %s)", file.filename, file.size, file.content_type)
+        
+        # Reject what can't be a usable resume before reading or parsing anything
+        if not (file.filename or "").lower().endswith(SUPPORTED_EXTENSIONS):
+            return ORJSONResponse({
+                "success": False,
+                "error": "Unsupported file type. Please upload a PDF, DOCX or TXT resume.",
+                "data": None
+            }, status_code=415)
+        if file.size is not None and file.size < MIN_TEXT_CHARS:
+            # Fewer bytes than the minimum character count
+            return ORJSONResponse(_TOO_SHORT_RESPONSE)
+        
+        source, digest = await read_upload(file)
+        # Re-uploads of the same file for the same role skip extraction and analysis
+        cache_key = f"{digest}|{jobTitle or ''}"
+        cached = _parse_cache_get(cache_key)
+        if cached is not None:
+            _discard_upload(source)
+            logger.debug("Serving cached resume analysis")
+            return ORJSONResponse(cached)
+        
+        # Extract text content from the file
+        text_content = await extract_text(source, file.filename)
+        
+        if not text_content or len(text_content.strip()) < MIN_TEXT_CHARS:
+            return ORJSONResponse(_TOO_SHORT_RESPONSE)
+        
+        logger.debug("Extracted text length: %d characters", len(text_content))
+        logger.debug("Text preview: %.200s...", text_content)
+        
+        snippet = text_content[:4000]
+        
+        # Try ML parser first
+        ml_parser, confidence_fn = _load_ml_parser() if len(text_content) >= ML_MIN_TEXT_CHARS else (None, None)
+        if ml_parser:
+            try:
+                logger.debug("Attempting ML-based resume parsing...")
+                ml_result = await asyncio.to_thread(_parse_resume_ml, text_content, ml_parser, jobTitle)
+                confidence = confidence_fn(ml_result)
+                
+                logger.debug("ML parsing confidence: %.2f", confidence)
+                
+                if confidence >= 0.7:  # Confidence threshold
+                    # Apply role profile alignment if jobTitle provided
+                    if jobTitle:
+                        role_profile = _load_role_profile(jobTitle)
+                        if role_profile:
+                            ml_result = _apply_role_alignment(ml_result, role_profile, jobTitle)
+                    
+                    logger.debug("ML parsing successful, returning ML results")
+                    return ORJSONResponse(_parse_cache_put(cache_key, {
+                        "success": True,
+                        "data": ml_result,
+                        "message": "Resume parsed successfully using ML model"
+                    }))
+                else:
+                    logger.debug("ML confidence too low (%.2f < 0.7), falling back to AI", confidence)
+            except Exception as ml_error:
+                logger.warning("ML parsing failed, falling back to AI: %s", ml_error)
+                # Continue to AI fallback
+        
+        # Only the truncated snippet is needed from here on; drop the full text
+        # so it is not held across the Gemini round-trip
+        del text_content
+        
+        # Fallback to AI service (existing code)
+        logger.debug("Using AI service for resume parsing...")
+        role_profile = _load_role_profile(jobTitle)
+        # Use Gemini AI for comprehensive resume analysis if configured
+        model = _model
+        
+        # Create comprehensive resume analysis prompt with truncated content
+        role_context = ""
+        if role_profile:
+            role_context = f"""
+            Target Role Profile:
+            Title: {role_profile.get('title', jobTitle)}
+            Seniority: {role_profile.get('seniority', 'unspecified')}
+            Must-Have Skills: {', '.join(role_profile.get('must_have_skills', [])[:30])}
+            Nice-to-Have Skills: {', '.join(role_profile.get('nice_to_have_skills', [])[:30])}
+            Impact Patterns: {', '.join(role_profile.get('impact_patterns', [])[:10])}
+            Anti-Patterns: {', '.join(role_profile.get('anti_patterns', [])[:10])}
+            """
+
+        # Senior exemplars from the KB ground the suggestions. Retrieval embeds the
+        # query over the network, so it only runs when Gemini will use the result
+        kb_context = await _retrieve_kb_context(snippet, jobTitle) if _kb is not None and model is not None else ""
+
+        analysis_prompt = "".join((
+            ANALYSIS_PROMPT_HEAD, snippet, "\n        \n        ", role_context, "\n        ", kb_context, ANALYSIS_PROMPT_TAIL,
+        ))
         
         try:
             if model is not None:
                 # Call Gemini AI for resume analysis
-                response = model.generate_content(analysis_prompt)
-                ai_analysis = response.text
-                
-                # Parse the AI response
-                start_idx = ai_analysis.find('{')
-                end_idx = ai_analysis.rfind('}') + 1
+                response = await model.generate_content_async(analysis_prompt, generation_config=_ANALYSIS_CONFIG)
+                parsed_data = orjson.loads(response.text)
                 
-                if start_idx != -1 and end_idx != -1:
-                    json_content = ai_analysis[start_idx:end_idx]
-                    parsed_data = json.loads(json_content)
-                    
-                    print(f"AI resume analysis successful")
-                    return JSONResponse({
+                if isinstance(parsed_data, dict):
+                    logger.debug("AI resume analysis successful")
+                    return ORJSONResponse(_parse_cache_put(cache_key, {
                         "success": True,
                         "data": parsed_data,
                         "message": "Resume parsed successfully using AI analysis"
-                    })
+                    }))
                 else:
                     # Fallback if JSON parsing fails
                     raise Exception("AI response format invalid")
             else:
                 raise Exception("No API key configured; using fallback")
         except Exception as ai_error:
-            print(f"AI resume analysis failed: {str(ai_error)}")
+            logger.warning("AI resume analysis failed: %s", ai_error)
             # Fallback to enhanced dummy data
-            parsed_data = {
-                "skills": ["JavaScript", "React", "Node.js", "Python", "SQL", "Git", "AWS", "Docker", "TypeScript", "MongoDB"],
-                "experience": [
-                    {
-                        "title": "Senior Software Engineer",
-                        "company": "Tech Solutions Inc.",
-                        "duration": "2022 - Present",
-                        "achievements": [
-                            "Led development of microservices architecture",
-                            "Improved system performance by 40%",
-                            "Mentored 3 junior developers"
-                        ]
-                    },
-                    {
-                        "title": "Full Stack Developer",
-                        "company": "Digital Innovations",
-                        "duration": "2020 - 2022",
-                        "achievements": [
-                            "Built responsive web applications",
-                            "Implemented CI/CD pipelines",
-                            "Reduced bug reports by 30%"
-                        ]
-                    }
-                ],
-                "education": {
-                    "degree": "Bachelor of Science in Computer Science",
-                    "institution": "University of Technology",
-                    "year": "2020",
-                    "gpa": "3.8/4.0"
-                },
-                "projects": [
-                    {
-                        "name": "E-commerce Platform",
-                        "description": "Full-stack e-commerce solution with payment integration",
-                        "technologies": ["React", "Node.js", "MongoDB", "Stripe"],
-                        "outcome": "Successfully deployed and serving 1000+ users"
-                    },
-                    {
-                        "name": "Task Management App",
-                        "description": "Collaborative project management tool",
-                        "technologies": ["Vue.js", "Express", "PostgreSQL"],
-                        "outcome": "Used by 5 development teams"
-                    }
-                ],
-                "certifications": ["AWS Certified Developer", "MongoDB Certified Developer", "Google Cloud Professional"],
-                "summary": "Experienced full-stack developer with 3+ years building scalable web applications. Passionate about clean code, user experience, and continuous learning. Strong expertise in modern JavaScript frameworks, cloud services, and agile development methodologies.",
-                "contact": {"email": "developer@example.com", "phone": "+1-555-0123", "location": "San Francisco, CA", "linkedin": "linkedin.com/in/developer"}
-            }
+            parsed_data = _FALLBACK_DATA
             
             # If role profile exists, add deterministic coverage checks
             if role_profile:
-                must = set([s.lower() for s in role_profile.get("must_have_skills", [])])
-                has = set([s.lower() for s in parsed_data.get("skills", [])])
-                missing = [s for s in role_profile.get("must_have_skills", []) if s.lower() not in has]
-                parsed_data["roleAlignment"] = {
-                    "targetRole": role_profile.get("title", jobTitle),
-                    "mustHaveCoverage": round(100 * (len(must.intersection(has)) / max(len(must) or 1, 1))),
-                    "missingMustHaves": missing[:10]
-                }
+                # Only a top-level key is added, so a shallow copy keeps the constant intact
+                parsed_data = _apply_role_alignment(dict(parsed_data), role_profile, jobTitle)
 
-            print(f"Fallback resume parsing. Using enhanced dummy data")
-            return JSONResponse({
+            logger.debug("Fallback resume parsing. Using enhanced dummy data")
+            return ORJSONResponse({
                 "success": True,
                 "data": parsed_data,
                 "message": "Resume parsed successfully (fallback mode)"
             })
         
+    except UploadTooLarge as e:
+        return ORJSONResponse({"success": False, "error": str(e), "data": None}, status_code=413)
     except Exception as e:
-        print(f"Error in parse_resume: {str(e)}")
-        return JSONResponse({
+        logger.error("Error in parse_resume: %s", e)
+        return ORJSONResponse({
             "success": False,
             "error": str(e),
             "data": None
@@ -0,0 +1,40 @@
+"""
+Shared logging setup for the AI services.
+
+Records are handed to a queue and written out by a listener thread, so the
+request path never blocks on console I/O. Per-request diagnostics are DEBUG
+and therefore off unless LOG_LEVEL=DEBUG.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Optional
+
+# Process that owns the running listener; a forked child inherits the handler
+# but not the listener thread, so it has to set up its own
+_listener_pid: Optional[int] = None
+
+
+def setup_logging() -> None:
+    """Route root logging through a queue drained by a listener thread in this process.
+
+    Idempotent per process. Call it at import in each service and as the
+    initializer of any process pool whose workers log.
+    """
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for handler in [h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        root.removeHandler(handler)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, console)
+    listener.start()
+    atexit.register(listener.stop)
+    _listener_pid = os.getpid()
@@ -2,13 +2,44 @@
 Verification script to check if ML resume parser integration is working correctly.
 """
 import os
+import re
 import sys
 import json
+from functools import lru_cache
 from pathlib import Path
 
+@lru_cache(maxsize=None)
+def _read(path: Path) -> str:
+    """File contents, read once per path for the whole run."""
+    return path.read_text(encoding="utf-8")
+
+# Every marker the source checks look for, matched in one pass over the file
+_MARKERS = (
+    '_load_ml_parser', '_parse_resume_ml', 'confidence >= 0.7', 'TORCH_AVAILABLE',
+    '"success": True', '"data":', 'skills', 'experience', 'education', 'projects', 'certifications',
+)
+_MARKER_RE = re.compile("|".join(map(re.escape, _MARKERS)) + r"|(?i:falling back to ai)")
+
+@lru_cache(maxsize=None)
+def _markers_in(path: Path) -> frozenset:
+    """Markers present in a file; the AI fallback phrase is normalised to lowercase."""
+    return frozenset(
+        m.group(0) if m.group(0) in _MARKERS else m.group(0).lower()
+        for m in _MARKER_RE.finditer(_read(path))
+    )
+
+@lru_cache(maxsize=None)
+def _listing(dirpath: str) -> frozenset:
+    """Entry names of a directory, from one scandir per directory."""
+    try:
+        with os.scandir(dirpath) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
 def check_file_exists(filepath: str, description: str) -> tuple[bool, str]:
     """Check if a file exists."""
-    exists = os.path.exists(filepath)
+    exists = os.path.basename(filepath) in _listing(os.path.dirname(filepath))
     status = "✓" if exists else "✗"
     return exists, f"{status} {description}: {filepath}"
 
@@ -64,7 +95,7 @@ def check_code_structure() -> list[tuple[bool, str]]:
     
     # Check if model exists
     model_path = models_dir / "model.pt"
-    if model_path.exists():
+    if check_file_exists(str(model_path), "Trained model")[0]:
         results.append((True, "✓ Trained model found (ML parser will be used)"))
     else:
         results.append((False, "✗ No trained model found (will fallback to AI)"))
@@ -78,12 +109,10 @@ def check_requirements() -> list[tuple[bool, str]]:
     req_file = base_dir / "requirements.txt"
     
     if req_file.exists():
-        with open(req_file, 'r') as f:
-            content = f.read()
-            if 'torch' in content:
-                results.append((True, "✓ torch is in requirements.txt"))
-            else:
-                results.append((False, "✗ torch is missing from requirements.txt"))
+        if 'torch' in _read(req_file):
+            results.append((True, "✓ torch is in requirements.txt"))
+        else:
+            results.append((False, "✗ torch is missing from requirements.txt"))
     else:
         results.append((False, "✗ requirements.txt not found"))
     
@@ -96,34 +125,32 @@ def check_integration_logic() -> list[tuple[bool, str]]:
     parser_file = base_dir / "resume_parser.py"
     
     if parser_file.exists():
-        with open(parser_file, 'r') as f:
-            content = f.read()
-            
-            # Check for ML-first logic
-            if '_load_ml_parser' in content:
-                results.append((True, "✓ _load_ml_parser function exists"))
-            else:
-                results.append((False, "✗ _load_ml_parser function missing"))
-            
-            if '_parse_resume_ml' in content:
-                results.append((True, "✓ _parse_resume_ml function exists"))
-            else:
-                results.append((False, "✗ _parse_resume_ml function missing"))
-            
-            if 'confidence >= 0.7' in content or 'confidence >= 0.7' in content:
-                results.append((True, "✓ Confidence threshold check exists"))
-            else:
-                results.append((False, "✗ Confidence threshold check missing"))
-            
-            if 'falling back to AI' in content.lower():
-                results.append((True, "✓ AI fallback logic exists"))
-            else:
-                results.append((False, "✗ AI fallback logic missing"))
-            
-            if 'TORCH_AVAILABLE' in content:
-                results.append((True, "✓ Torch availability check exists"))
-            else:
-                results.append((False, "✗ Torch availability check missing"))
+        found = _markers_in(parser_file)
+        # Check for ML-first logic
+        if '_load_ml_parser' in found:
+            results.append((True, "✓ _load_ml_parser function exists"))
+        else:
+            results.append((False, "✗ _load_ml_parser function missing"))
+        
+        if '_parse_resume_ml' in found:
+            results.append((True, "✓ _parse_resume_ml function exists"))
+        else:
+            results.append((False, "✗ _parse_resume_ml function missing"))
+        
+        if 'confidence >= 0.7' in found:
+            results.append((True, "✓ Confidence threshold check exists"))
+        else:
+            results.append((False, "✗ Confidence threshold check missing"))
+        
+        if 'falling back to ai' in found:
+            results.append((True, "✓ AI fallback logic exists"))
+        else:
+            results.append((False, "✗ AI fallback logic missing"))
+        
+        if 'TORCH_AVAILABLE' in found:
+            results.append((True, "✓ Torch availability check exists"))
+        else:
+            results.append((False, "✗ Torch availability check missing"))
     
     return results
 
@@ -134,23 +161,21 @@ def check_response_format() -> list[tuple[bool, str]]:
     parser_file = base_dir / "resume_parser.py"
     
     if parser_file.exists():
-        with open(parser_file, 'r') as f:
-            content = f.read()
-            
-            # Check for correct response structure
-            if '"success": True' in content and '"data":' in content:
-                results.append((True, "✓ Response format includes success and data fields"))
-            else:
-                results.append((False, "✗ Response format may be incorrect"))
-            
-            # Check for required fields in ML output
-            required_fields = ['skills', 'experience', 'education', 'projects', 'certifications']
-            all_present = all(field in content for field in required_fields)
-            if all_present:
-                results.append((True, "✓ ML output includes all required fields"))
-            else:
-                missing = [f for f in required_fields if f not in content]
-                results.append((False, f"✗ Missing fields in ML output: {missing}"))
+        found = _markers_in(parser_file)
+        # Check for correct response structure
+        if '"success": True' in found and '"data":' in found:
+            results.append((True, "✓ Response format includes success and data fields"))
+        else:
+            results.append((False, "✗ Response format may be incorrect"))
+        
+        # Check for required fields in ML output
+        required_fields = ['skills', 'experience', 'education', 'projects', 'certifications']
+        all_present = all(field in found for field in required_fields)
+        if all_present:
+            results.append((True, "✓ ML output includes all required fields"))
+        else:
+            missing = [f for f in required_fields if f not in found]
+            results.append((False, f"✗ Missing fields in ML output: {missing}"))
     
     return results
 
@@ -162,41 +187,22 @@ def main():
     print()
     
     all_checks = []
+    sections = [
+        ("1. File Structure:", check_code_structure),
+        ("2. Dependencies:", check_requirements),
+        ("3. Imports:", check_imports),
+        ("4. Integration Logic:", check_integration_logic),
+        ("5. Response Format:", check_response_format),
+    ]
     
-    print("1. File Structure:")
-    print("-" * 60)
-    all_checks.extend(check_code_structure())
-    for exists, msg in check_code_structure():
-        print(f"  {msg}")
-    print()
-    
-    print("2. Dependencies:")
-    print("-" * 60)
-    all_checks.extend(check_requirements())
-    for exists, msg in check_requirements():
-        print(f"  {msg}")
-    print()
-    
-    print("3. Imports:")
-    print("-" * 60)
-    all_checks.extend(check_imports())
-    for exists, msg in check_imports():
-        print(f"  {msg}")
-    print()
-    
-    print("4. Integration Logic:")
-    print("-" * 60)
-    all_checks.extend(check_integration_logic())
-    for exists, msg in check_integration_logic():
-        print(f"  {msg}")
-    print()
-    
-    print("5. Response Format:")
-    print("-" * 60)
-    all_checks.extend(check_response_format())
-    for exists, msg in check_response_format():
-        print(f"  {msg}")
-    print()
+    for title, check in sections:
+        print(title)
+        print("-" * 60)
+        results = check()
+        all_checks.extend(results)
+        for exists, msg in results:
+            print(f"  {msg}")
+        print()
     
     # Summary
     print("=" * 60)
@@ -1,32 +1,70 @@
 """
-Voice-to-Text Service using OpenAI Whisper
-Converts WebM audio to WAV and transcribes using Whisper model
-Fallback to direct WebM processing if ffmpeg unavailable
+Voice-to-Text Service using Whisper
+Decodes WebM audio to 16 kHz PCM in memory with PyAV, falling back to ffmpeg on PATH when PyAV is missing
+Transcribes with faster-whisper (preferred) or OpenAI Whisper
 """
 
 import os
+import re
 import sys
+import asyncio
 import logging
-import tempfile
+import shutil
 import subprocess
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
+
+import numpy as np
+
+from service_logging import setup_logging
+
+# Per-request diagnostics are DEBUG and therefore off unless LOG_LEVEL=DEBUG
+setup_logging()
+logger = logging.getLogger(__name__)
+
+try:
+    # Optional CTranslate2 backend: int8 weights, several times faster on CPU
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None  # type: ignore
 
 try:
     import whisper
 except ImportError:
-    print('ERROR: whisper not installed. Run: pip install openai-whisper')
-    sys.exit(1)
+    whisper = None  # type: ignore
+    if WhisperModel is None:
+        logger.error("whisper not installed. Run: pip install openai-whisper")
+        sys.exit(1)
+
+try:
+    import av  # optional in-process libav decoding (installed with faster-whisper); else the ffmpeg CLI
+except ImportError:
+    av = None  # type: ignore
 
 from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One throwaway transcription so weight pages, BLAS/oneDNN kernels and
+    # thread pools are warm before the first real request
+    for loaded in (model, short_model):
+        if loaded is None:
+            continue
+        try:
+            await asyncio.to_thread(_transcribe_with, loaded, np.zeros(16000, dtype=np.float32))
+            logger.info("Whisper model warmed up")
+        except Exception as e:
+            logger.warning(f"Whisper warm-up failed: {e}")
+    yield
+
 
 # Initialize FastAPI app
-app = FastAPI(title="Voice STT Service", version="1.0.0")
+app = FastAPI(title="Voice STT Service", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Add CORS middleware for frontend communication
 app.add_middleware(
@@ -39,15 +77,111 @@ app.add_middleware(
 
 # Load Whisper model on startup
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base")
+# faster-whisper weight precision (int8, int8_float32, float32, ...)
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
 logger.info(f"Loading Whisper model: {WHISPER_MODEL}")
 
+# Optional smaller model (e.g. tiny.en) used for clips shorter than WHISPER_SHORT_CLIP_SECONDS
+WHISPER_SHORT_MODEL = os.getenv("WHISPER_SHORT_MODEL", "")
+WHISPER_SHORT_CLIP_SECONDS = float(os.getenv("WHISPER_SHORT_CLIP_SECONDS", "8"))
+
+
+def _load_model(name: str):
+    if WhisperModel is not None:
+        loaded = WhisperModel(name, device="cpu", compute_type=WHISPER_COMPUTE_TYPE)
+        logger.info(f"Successfully loaded faster-whisper model: {name} ({WHISPER_COMPUTE_TYPE})")
+    else:
+        loaded = whisper.load_model(name, device="cpu")
+        logger.info(f"Successfully loaded Whisper model: {name}")
+    return loaded
+
+
 try:
-    model = whisper.load_model(WHISPER_MODEL, device="cpu")
-    logger.info(f"Successfully loaded Whisper model: {WHISPER_MODEL}")
+    model = _load_model(WHISPER_MODEL)
 except Exception as e:
     logger.error(f"Failed to load Whisper model: {e}")
     model = None
 
+short_model = None
+if WHISPER_SHORT_MODEL and model is not None:
+    try:
+        short_model = _load_model(WHISPER_SHORT_MODEL)
+    except Exception as e:
+        logger.warning(f"Short-clip Whisper model unavailable, using {WHISPER_MODEL} for all clips: {e}")
+
+
+def transcribe(audio: np.ndarray) -> tuple:
+    """Transcribe 16 kHz mono samples, with the short-clip model when configured; returns (text, language)."""
+    if short_model is not None and len(audio) < WHISPER_SHORT_CLIP_SECONDS * 16000:
+        return _transcribe_with(short_model, audio)
+    return _transcribe_with(model, audio)
+
+
+def _transcribe_with(use, audio: np.ndarray) -> tuple:
+    if WhisperModel is not None:
+        # Segments are generated lazily; joining them runs the decode. VAD skips silence.
+        segments, info = use.transcribe(audio, language="en", vad_filter=True)
+        return "".join(segment.text for segment in segments), info.language
+    result = use.transcribe(
+        audio,
+        fp16=False,
+        language="en",
+        verbose=False
+    )
+    return result.get("text", ""), result.get("language", "en")
+
+
+# Transcriptions running at once; Whisper already spreads each one over several BLAS threads
+STT_CONCURRENCY = int(os.getenv("STT_CONCURRENCY", "2"))
+_transcribe_slots = asyncio.Semaphore(max(1, STT_CONCURRENCY))
+
+# Recordings above this are rejected with 413 before decoding
+MAX_AUDIO_BYTES = int(os.getenv("STT_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Room for the multipart boundaries and part headers around the recording
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+
+class AudioUploadLimit:
+    """Refuses /interview/stt requests whose declared body exceeds the limit.
+
+    Runs before Starlette parses the form, so an oversized recording is never
+    read or spooled. Chunked uploads carry no Content-Length and are checked
+    by upload_size once spooled.
+    """
+
+    def __init__(self, app, max_body: int) -> None:
+        self.app = app
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and scope["path"] == "/interview/stt":
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.max_body:
+                response = ORJSONResponse(
+                    {"detail": f"Audio file exceeds the upload limit of {MAX_AUDIO_BYTES} bytes."},
+                    status_code=413,
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(AudioUploadLimit, max_body=MAX_AUDIO_BYTES + MULTIPART_OVERHEAD_BYTES)
+
+
+def upload_size(audio: UploadFile) -> int:
+    """Size of the spooled upload in bytes; raises 413 above MAX_AUDIO_BYTES."""
+    size = audio.size
+    if size is None:
+        size = audio.file.seek(0, os.SEEK_END)
+    audio.file.seek(0)
+    if size > MAX_AUDIO_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Audio file exceeds the upload limit of {MAX_AUDIO_BYTES} bytes."
+        )
+    return size
+
 
 @app.get("/health")
 async def health_check():
@@ -56,51 +190,86 @@ async def health_check():
         "status": "ok",
         "service": "voice-stt",
         "model": WHISPER_MODEL,
+        "short_clip_model": WHISPER_SHORT_MODEL if short_model is not None else None,
+        "backend": "faster-whisper" if WhisperModel is not None else "openai-whisper",
         "model_loaded": model is not None
     }
 
 
-def convert_webm_to_wav(webm_path: str, wav_path: str) -> bool:
+def decode_audio(source: BinaryIO) -> np.ndarray:
     """
-    Convert WebM audio file to WAV using ffmpeg.
-    Returns True if successful, False otherwise.
+    Decode uploaded audio (WebM/Opus etc.) to 16 kHz mono float32 samples, in
+    process with PyAV when available, otherwise by piping through the ffmpeg CLI
+    so nothing touches disk. Raises with the decoder's error message on failure.
     """
-    try:
-        # Check if ffmpeg is available
-        subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True, timeout=5)
-    except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-        logger.warning("ffmpeg not found. Attempting to process WebM directly with Whisper.")
-        return False
-    
-    try:
-        subprocess.run(
-            [
-                "ffmpeg",
-                "-i", webm_path,
-                "-ar", "16000",
-                "-ac", "1",
-                "-c:a", "pcm_s16le",
-                wav_path,
-                "-loglevel", "quiet"
-            ],
-            check=True,
-            capture_output=True,
-            timeout=30
-        )
-        logger.info(f"Successfully converted WebM to WAV: {wav_path}")
-        return True
-    except Exception as e:
-        logger.error(f"FFmpeg conversion failed: {e}")
-        return False
+    if av is not None:
+        return _decode_with_av(source)
+    proc = subprocess.run(
+        [
+            "ffmpeg",
+            "-i", "pipe:0",
+            "-f", "s16le",
+            "-ar", "16000",
+            "-ac", "1",
+            "-loglevel", "error",
+            "pipe:1"
+        ],
+        input=source.read(),
+        capture_output=True,
+        timeout=30
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed: {proc.stderr.decode('utf-8', 'ignore').strip()}")
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def _decode_with_av(source: BinaryIO) -> np.ndarray:
+    # PyAV reads the spooled upload file directly, so the payload is never copied into a bytes object
+    with av.open(source, mode="r") as container:
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=16000)
+        chunks = []
+        for frame in container.decode(container.streams.audio[0]):
+            chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(frame))
+        chunks.extend(out.to_ndarray().reshape(-1) for out in resampler.resample(None))  # flush
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
 
 
+@lru_cache(maxsize=1)
 def ffmpeg_available() -> bool:
-    """Return True if ffmpeg binary is available on PATH."""
-    try:
-        subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True, timeout=5)
+    """Return True if ffmpeg binary is available on PATH (looked up once per process)."""
+    return shutil.which("ffmpeg") is not None
+
+
+# Clips shorter than this, or quieter than this RMS level (full scale = 1.0), skip Whisper
+MIN_SPEECH_SAMPLES = 16000 // 2
+SILENCE_RMS = 1e-3
+
+
+def is_silent(samples: np.ndarray) -> bool:
+    """True for decoded audio too short or too quiet to contain speech."""
+    if len(samples) < MIN_SPEECH_SAMPLES:
         return True
-    except Exception:
-        return False
+    return float(np.sqrt(np.dot(samples, samples) / len(samples))) < SILENCE_RMS
+
+
+# Transcription failures mapped to (status, message) by the first pattern found in the error
+_ERROR_CLASSES = (
+    (
+        re.compile(r"Invalid data found when processing input|(?i:unrecognized format)"),
+        400,
+        "Audio file is corrupted or incomplete. "
+        "Try recording again and ensure 3+ seconds of audio. "
+        "If using older browser, try Chrome or Firefox.",
+    ),
+    (re.compile(r"whisper|model", re.IGNORECASE), 503, "Whisper model error. Try restarting the service."),
+    (
+        re.compile(r"ffmpeg|decode", re.IGNORECASE),
+        500,
+        "Audio format error. Install ffmpeg or use a different audio format.",
+    ),
+)
 
 
 @app.post("/interview/stt")
@@ -130,33 +299,21 @@ async def transcribe_audio(audio: UploadFile = File(...)):
             detail="No audio file provided"
         )
     
-    temp_wav_path = None
-    temp_webm_path = None
-    audio_path = None
-    
     try:
-        logger.info(f"📥 Received audio: {audio.filename} (Content-Type: {audio.content_type})")
+        logger.debug("📥 Received audio: %s (Content-Type: %s)", audio.filename, audio.content_type)
         
-        # Save uploaded WebM to temporary file
-        temp_webm_path = tempfile.NamedTemporaryFile(
-            delete=False,
-            suffix=".webm"
-        ).name
+        size = upload_size(audio)
         
-        content = await audio.read()
-        with open(temp_webm_path, "wb") as f:
-            f.write(content)
+        file_size_kb = size / 1024
+        logger.debug("📊 File size: %.1f KB", file_size_kb)
         
-        file_size_kb = len(content) / 1024
-        logger.info(f"📊 File size: {file_size_kb:.1f} KB")
-        
-        if len(content) == 0:
+        if size == 0:
             raise HTTPException(status_code=400, detail="Audio file is empty")
         
         # WebM files should typically be at least 20 KB for a few seconds of audio
         # Smaller files are likely incomplete or corrupted from the browser
-        if len(content) < 10000:  # < 10 KB is suspicious
-            logger.warning(f"⚠️ Audio file very small ({file_size_kb:.1f} KB). May be incomplete.")
+        if size < 10000:  # < 10 KB is suspicious
+            logger.warning("⚠️ Audio file very small (%.1f KB). May be incomplete.", file_size_kb)
             raise HTTPException(
                 status_code=400,
                 detail=(
@@ -166,11 +323,10 @@ async def transcribe_audio(audio: UploadFile = File(...)):
                 )
             )
         
-        # Ensure ffmpeg is available. Whisper and our conversion both rely on ffmpeg
-        # when handling WebM/Opus content. If ffmpeg is not present, return a
-        # clear 503 so the frontend can surface a helpful message instead of
-        # allowing Whisper to raise a FileNotFoundError internally.
-        if not ffmpeg_available():
+        # Ensure ffmpeg is available; decoding WebM/Opus content relies on it.
+        # If ffmpeg is not present, return a clear 503 so the frontend can
+        # surface a helpful message instead of a FileNotFoundError.
+        if av is None and not ffmpeg_available():
             logger.warning("ffmpeg not found. Cannot process WebM audio without ffmpeg.")
             raise HTTPException(
                 status_code=503,
@@ -180,42 +336,28 @@ async def transcribe_audio(audio: UploadFile = File(...)):
                 ),
             )
 
-        # Try to convert WebM to WAV using ffmpeg
-        temp_wav_path = tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name
-
-        try:
-            conversion_success = convert_webm_to_wav(temp_webm_path, temp_wav_path)
-        except Exception as e:
-            logger.warning(f"⚠️ WebM conversion failed: {e}")
-            conversion_success = False
-
-        # Use WAV if conversion successful, otherwise fall back to WebM (rare)
-        if conversion_success and os.path.exists(temp_wav_path) and os.path.getsize(temp_wav_path) > 0:
-            audio_path = temp_wav_path
-            logger.info("✅ Using converted WAV file for transcription")
-        else:
-            audio_path = temp_webm_path
-            logger.warning("⚠️ Using WebM directly (conversion failed despite ffmpeg present)")
-            logger.info("Tip: Check ffmpeg output and file integrity")
-        
-        # Transcribe using Whisper
-        logger.info("🎵 Transcribing audio with Whisper...")
-        result = model.transcribe(
-            audio_path,
-            fp16=False,
-            language="en",
-            verbose=False
-        )
-        
-        transcript = result.get("text", "").strip()
-        language = result.get("language", "en")
+        # Decoding and transcription are CPU-bound; run them off the event loop
+        # so /health and other uploads keep being served
+        async with _transcribe_slots:
+            # Decode straight to PCM samples in memory; no temp files
+            samples = await asyncio.to_thread(decode_audio, audio.file)
+            logger.debug("✅ Decoded %.1fs of audio", len(samples) / 16000)
+            
+            if is_silent(samples):
+                # Nothing for Whisper to hear; skip the model entirely
+                transcript, language = "", "en"
+            else:
+                # Transcribe using Whisper
+                logger.debug("🎵 Transcribing audio with Whisper...")
+                transcript, language = await asyncio.to_thread(transcribe, samples)
+        transcript = transcript.strip()
         
         if not transcript:
             logger.warning("⚠️ No speech detected in audio")
             transcript = "[No speech detected]"
         
-        logger.info(f"✅ Transcription complete: {len(transcript)} chars, language: {language}")
-        logger.debug(f"   Transcript: \"{transcript[:100]}...\"")
+        logger.debug("✅ Transcription complete: %d chars, language: %s", len(transcript), language)
+        logger.debug("   Transcript: \"%.100s...\"", transcript)
         
         return {
             "transcript": transcript,
@@ -227,43 +369,17 @@ async def transcribe_audio(audio: UploadFile = File(...)):
         raise
     except Exception as e:
         error_msg = str(e)
-        logger.error(f"❌ Transcription failed: {error_msg}", exc_info=True)
+        logger.error("❌ Transcription failed: %s", error_msg, exc_info=True)
         
         # Provide context-specific error messages
-        if "Invalid data found when processing input" in error_msg or "unrecognized format" in error_msg.lower():
-            detail = (
-                "Audio file is corrupted or incomplete. "
-                "Try recording again and ensure 3+ seconds of audio. "
-                "If using older browser, try Chrome or Firefox."
-            )
-            status_code = 400
-        elif "whisper" in error_msg.lower() or "model" in error_msg.lower():
-            detail = "Whisper model error. Try restarting the service."
-            status_code = 503
-        elif "ffmpeg" in error_msg.lower() or "decode" in error_msg.lower():
-            detail = "Audio format error. Install ffmpeg or use a different audio format."
-            status_code = 500
+        for pattern, status_code, detail in _ERROR_CLASSES:
+            if pattern.search(error_msg):
+                break
         else:
             detail = f"Transcription failed: {error_msg}"
             status_code = 500
         
         raise HTTPException(status_code=status_code, detail=detail)
-        
-    finally:
-        # Clean up temporary files
-        if temp_webm_path and os.path.exists(temp_webm_path):
-            try:
-                os.remove(temp_webm_path)
-                logger.info(f"Cleaned up WebM temp file: {temp_webm_path}")
-            except Exception as e:
-                logger.warning(f"Failed to delete WebM temp file: {e}")
-        
-        if temp_wav_path and os.path.exists(temp_wav_path):
-            try:
-                os.remove(temp_wav_path)
-                logger.info(f"Cleaned up WAV temp file: {temp_wav_path}")
-            except Exception as e:
-                logger.warning(f"Failed to delete WAV temp file: {e}")
 
 
 if __name__ == "__main__":
@@ -88,7 +88,7 @@ const UploadForm = ({
               id="resume"
               name="resume"
               type="file"
-              accept=".pdf,.docx,.doc"
+              accept=".pdf,.docx,.txt"
               className="hidden"
               onChange={(e) => onFileChange(e.target.files?.[0] || null)}
             />
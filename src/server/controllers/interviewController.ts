@@ -21,7 +21,7 @@ export const startInterview = async (req: express.Request, res: express.Response
     console.log(`Starting interview for userId: ${userId}, jobTitle: ${jobTitle}`);
 
     // Generate interview questions using AI service
-    const questionsResponse = await generateInterviewQuestions(jobTitle, resumeData, difficulty, numQuestions);
+    const questionsResponse = await generateInterviewQuestions(jobTitle, resumeData, difficulty, numQuestions, String(userId));
     
     if (!(questionsResponse as any).success) {
       return res.status(500).json({ message: 'Failed to generate interview questions' });
@@ -125,7 +125,8 @@ export async function generateInterviewQuestions(
   jobTitle: string,
   resumeData: unknown = {},
   difficulty: string = 'medium',
-  numQuestions: number = 5
+  numQuestions: number = 5,
+  userId?: string
 ): Promise<unknown> {
   const url = `${AI_SERVICES.INTERVIEW_GENERATOR}/generate`;
 
@@ -135,7 +136,8 @@ export async function generateInterviewQuestions(
         jobTitle,
         resume: resumeData,
         difficulty,
-        numQuestions
+        numQuestions,
+        userId
       }, {
         timeout: RETRY_CONFIG.timeout
       });